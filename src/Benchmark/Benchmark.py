@@ -0,0 +1,134 @@
+"""
+Author: 	Gari Arellano
+Date:		18-10-2026
+Project: 	Atlassian
+Filename:	Benchmark.py
+Description:
+  This file contains the Benchmark class which runs main.__main__ against the StandInServer
+  and measures the throughput (operations per minute), the latency of each stage (p50 and
+  p99) and the peak RSS of the process.
+"""
+
+from .StandInServer import StandInServer
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+class Benchmark:
+    # PRE: <server_options> are the parameters of the StandInServer (operations, hosts,
+    #      steps, output_size, latency, error_rate, rate_limit_rate...)
+    #      <env> is an optional dictionary with extra environment variables for the service
+    #      (for example max_concurrent_operations)
+    def __init__(self, env=None, **server_options):
+        self.__server_options = server_options
+        self.__env = env if env is not None else {}
+        self.__durations = {}
+
+    # PRE: <stage> is the name of the stage and <seconds> its duration
+    # POST: Saves the duration of the stage
+    def record(self, stage, seconds):
+        self.__durations.setdefault(stage, []).append(seconds)
+
+    # PRE: True
+    # POST: Runs the service once against a new StandInServer in a temporary directory and
+    #       returns a dictionary with the results
+    async def run(self):
+        workdir = tempfile.mkdtemp(prefix="caldera-benchmark-")
+        original_dir = os.getcwd()
+        # Values of the environment variables changed by the run, restored when it ends
+        saved = {}
+        try:
+            async with StandInServer(**self.__server_options) as server:
+                overrides = dict(server.env())
+                if "log_dir" not in os.environ:
+                    overrides["log_dir"] = os.path.join(workdir, "logs")
+                overrides["checkpoint_db"] = os.path.join(workdir, "checkpoints.sqlite3")
+                overrides.update(self.__env)
+                saved = {key: os.environ.get(key) for key in overrides}
+                os.environ.update(overrides)
+                # The whitelist repository and the logs are written in the working directory
+                os.chdir(workdir)
+                main = None
+                try:
+                    main = self.__import_main()
+                    main.stage_recorder = self.record
+                    started = time.perf_counter()
+                    summary = await main.__main__()
+                    elapsed = time.perf_counter() - started
+                finally:
+                    if main is not None:
+                        main.stage_recorder = None
+                    os.chdir(original_dir)
+                counters = server.counters()
+        finally:
+            for key, value in saved.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        return {
+            "operations": len(summary["succeeded"]) + len(summary["failed"]),
+            "failed": len(summary["failed"]),
+            "seconds": elapsed,
+            "operations_per_minute": len(summary["succeeded"]) / elapsed * 60 if elapsed else 0,
+            "stages": {
+                stage: {
+                    "count": len(durations),
+                    "p50": self.percentile(durations, 50),
+                    "p99": self.percentile(durations, 99)
+                }
+                for stage, durations in self.__durations.items()
+            },
+            "peak_rss_mb": self.peak_rss_mb(),
+            "server": counters
+        }
+
+    # PRE: <results> is a dictionary returned by run()
+    # POST: Returns a string with the results formatted as a table
+    def format(self, results):
+        lines = [
+            f"Operations:        {results['operations']} ({results['failed']} failed)",
+            f"Elapsed:           {results['seconds']:.2f} s",
+            f"Throughput:        {results['operations_per_minute']:.1f} operations/min",
+            f"Peak RSS:          {results['peak_rss_mb']:.1f} MB",
+            f"Server:            {results['server']}",
+            "",
+            f"{'Stage':<12}{'count':>8}{'p50 (ms)':>12}{'p99 (ms)':>12}"
+        ]
+        for stage, stats in results["stages"].items():
+            lines.append(
+                f"{stage:<12}{stats['count']:>8}{stats['p50'] * 1000:>12.1f}"
+                f"{stats['p99'] * 1000:>12.1f}"
+            )
+        return "\n".join(lines)
+
+    # PRE: <values> is a list of numbers and <percent> a number between 0 and 100
+    # POST: Returns the <percent> percentile of <values> (nearest rank), or 0 if it is empty
+    @staticmethod
+    def percentile(values, percent):
+        if not values:
+            return 0
+        ordered = sorted(values)
+        rank = max(1, -(-len(ordered) * percent // 100))
+        return ordered[int(rank) - 1]
+
+    # PRE: True
+    # POST: Returns the peak resident set size of the process in MB
+    @staticmethod
+    def peak_rss_mb():
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+    # PRE: The environment points to the stand-in server
+    # POST: Returns the main module. It is imported here because it reads the environment
+    #       (log_dir) when it is imported.
+    @staticmethod
+    def __import_main():
+        import main
+        return main
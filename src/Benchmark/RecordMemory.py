@@ -0,0 +1,148 @@
+"""
+Author: 	Gari Arellano
+Date:		18-10-2026
+Project: 	Atlassian
+Filename:	RecordMemory.py
+Description:
+  This file contains the RecordMemory class which measures the memory kept by the relevant
+  data of a synthetic Caldera report: the steps extracted as StepRecord objects by
+  CreateReport against the steps extracted as one dictionary per step (as it was done before).
+  The memory is measured with tracemalloc once the raw payload is released.
+"""
+
+from Service.Report.CreateReport import CreateReport
+from Service.Report.WhiteListSnapshot import WhiteListSnapshot
+import gc
+import json
+import logging
+import tracemalloc
+
+class RecordMemory:
+    # PRE: <steps> is the total number of steps of the synthetic report
+    #      <hosts> is the number of hosts the steps are spread over
+    #      <abilities> is the number of different abilities executed in each host
+    #      <output_size> is the number of bytes of the stdout of each step
+    def __init__(self, steps=100000, hosts=10, abilities=50, output_size=100):
+        self.__steps = steps
+        self.__hosts = hosts
+        self.__abilities = abilities
+        self.__output_size = output_size
+
+    # PRE: True
+    # POST: Returns a dictionary with the bytes kept by the dictionaries, by the records and
+    #       the bytes saved per 100k steps
+    def run(self):
+        # The extraction logs every step, which would dominate the measure
+        logging.disable(logging.INFO)
+        try:
+            payload = self.__create_payload()
+            dictionaries = self.__measure(payload, self.__extract_dictionaries)
+            records = self.__measure(payload, self.__extract_records)
+        finally:
+            logging.disable(logging.NOTSET)
+        saved = dictionaries - records
+        return {
+            "steps": self.__steps,
+            "dictionaries_bytes": dictionaries,
+            "records_bytes": records,
+            "saved_per_100k_steps": saved * 100000 / self.__steps if self.__steps else 0
+        }
+
+    # PRE: <results> is a dictionary returned by run()
+    # POST: Returns a string with the results
+    def format(self, results):
+        mb = 1024 * 1024
+        return "\n".join([
+            f"Steps:              {results['steps']}",
+            f"Dictionaries:       {results['dictionaries_bytes'] / mb:.1f} MB",
+            f"Records:            {results['records_bytes'] / mb:.1f} MB",
+            f"Saved per 100k:     {results['saved_per_100k_steps'] / mb:.1f} MB"
+        ])
+
+    # PRE: <payload> is the JSON text of the report and the event logs
+    #      <extract> is a function that returns the relevant data of the parsed payload
+    # POST: Returns the bytes kept by the relevant data after the payload is released
+    def __measure(self, payload, extract):
+        gc.collect()
+        tracemalloc.start()
+        try:
+            # The payload is parsed inside the trace, like a response of Caldera: each step has
+            # its own copy of the strings
+            report, event_logs = json.loads(payload)
+            data = extract(report, event_logs)
+            del report, event_logs
+            gc.collect()
+            kept, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        del data
+        return kept
+
+    # PRE: <report> and <event_logs> are the parsed payload
+    # POST: Returns the steps extracted by CreateReport (StepRecord objects)
+    def __extract_records(self, report, event_logs):
+        create_report = CreateReport(report, event_logs)
+        return create_report.extract_relevant_data(WhiteListSnapshot({}))["steps"]
+
+    # PRE: <report> and <event_logs> are the parsed payload
+    # POST: Returns the steps extracted as one dictionary per step
+    def __extract_dictionaries(self, report, event_logs):
+        outputs = {}
+        for entry in event_logs:
+            outputs.setdefault(entry["pid"], entry["output"]["stdout"])
+        hosts = {host["paw"]: host for host in report["host_group"]}
+        steps = []
+        for paw, step_list in report["steps"].items():
+            host = hosts[paw]
+            for step in step_list["steps"]:
+                steps.append({
+                    "host": host["host"],
+                    "ip": host["host_ip_addrs"][0],
+                    "group": host["group"],
+                    "name": step["name"],
+                    "technique_id": step["attack"]["technique_id"],
+                    "command": step["command"],
+                    "plaintext_command": step["plaintext_command"],
+                    "platform": step["platform"],
+                    "description": step["description"],
+                    "output": outputs.get(step["pid"], "No output available"),
+                    "status": "Success" if step["status"] == 0 else "Failed",
+                    "ability_id": step["ability_id"]
+                })
+        return steps
+
+    # PRE: True
+    # POST: Returns the JSON text of a synthetic report and its event logs
+    def __create_payload(self):
+        host_group = []
+        steps = {}
+        event_logs = []
+        per_host = max(1, self.__steps // max(1, self.__hosts))
+        for number in range(self.__hosts):
+            paw = f"paw-{number}"
+            host_group.append({
+                "paw": paw,
+                "host": f"host-{number}",
+                "group": "client",
+                "platform": "windows",
+                "host_ip_addrs": [f"10.0.0.{number % 256}"],
+                "privilege": "Elevated"
+            })
+            steps[paw] = {"steps": []}
+            for index in range(per_host):
+                ability = index % self.__abilities
+                pid = number * per_host + index
+                steps[paw]["steps"].append({
+                    "name": f"Ability {ability}",
+                    "attack": {"technique_id": f"T{1000 + ability}"},
+                    "command": f"cG93ZXJzaGVsbCAtYyBhYmlsaXR5LXthYmlsaXR5fQ=={ability}",
+                    "plaintext_command": f"powershell -c ability-{ability}",
+                    "platform": "windows",
+                    "description": f"Description of the ability {ability}",
+                    "pid": pid,
+                    "status": index % 2,
+                    "ability_id": f"ability-{ability}"
+                })
+                event_logs.append({"pid": pid, "output": {"stdout": "x" * self.__output_size}})
+        return json.dumps([{"name": "Memory", "host_group": host_group, "steps": steps},
+                           event_logs])
@@ -0,0 +1,111 @@
+"""
+Author: 	Gari Arellano
+Date:		18-10-2026
+Project: 	Atlassian
+Filename:	RenderBenchmark.py
+Description:
+  This file contains the RenderBenchmark class which measures the cost of rendering the HTML
+  of a report, without the charts and the statistics: the compilation of the template on every
+  report (as it was done before) against the environment that compiles it once, the cold start
+  of a process with and without the bytecode cache, and the render of the rows and the page
+  per 1000 steps.
+"""
+
+from Service.Report.GenerateHtml import TEMPLATE_DIR, STEP_ROW_TEMPLATE, REPORT_TEMPLATE
+from Service.Report.Models import StepRecord, HostRecord
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, Template
+import os
+import shutil
+import tempfile
+import time
+
+class RenderBenchmark:
+    # PRE: <steps> is the number of steps of the synthetic report
+    #      <repeats> is the number of times each measure is repeated (the best one is kept)
+    def __init__(self, steps=1000, repeats=5):
+        self.__steps = steps
+        self.__repeats = repeats
+
+    # PRE: True
+    # POST: Returns a dictionary with the seconds of each measure
+    def run(self):
+        with open(os.path.join(TEMPLATE_DIR, "report.html"), encoding="utf-8") as file:
+            source = file.read()
+        data, stats = self.__create_report()
+        rows = [STEP_ROW_TEMPLATE.render(step=step) for step in data["steps"]]
+
+        cache_dir = tempfile.mkdtemp(prefix="jinja-bytecode-")
+        try:
+            # The first load writes the bytecode that the next cold starts read
+            self.__load(FileSystemBytecodeCache(cache_dir))
+            results = {
+                "steps": self.__steps,
+                "compile_per_report": self.__best(lambda: Template(source)),
+                "cold_start": self.__best(lambda: self.__load(None)),
+                "cold_start_bytecode_cache": self.__best(
+                    lambda: self.__load(FileSystemBytecodeCache(cache_dir))),
+                "rows": self.__best(
+                    lambda: [STEP_ROW_TEMPLATE.render(step=step) for step in data["steps"]]),
+                "page": self.__best(
+                    lambda: REPORT_TEMPLATE.render(report=data, stats=stats, pie_chart="",
+                                                   host_chart="", chart_mime="image/png",
+                                                   step_rows=rows))
+            }
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+        per_1k = 1000 / self.__steps if self.__steps else 0
+        results["render_per_1k_steps"] = (results["rows"] + results["page"]) * per_1k
+        return results
+
+    # PRE: <results> is a dictionary returned by run()
+    # POST: Returns a string with the results
+    def format(self, results):
+        ms = 1000
+        return "\n".join([
+            f"Steps:                       {results['steps']}",
+            f"Compile per report (before): {results['compile_per_report'] * ms:.2f} ms",
+            f"Cold start:                  {results['cold_start'] * ms:.2f} ms",
+            f"Cold start (bytecode cache): {results['cold_start_bytecode_cache'] * ms:.2f} ms",
+            f"Rows:                        {results['rows'] * ms:.2f} ms",
+            f"Page:                        {results['page'] * ms:.2f} ms",
+            f"Render per 1k steps:         {results['render_per_1k_steps'] * ms:.2f} ms"
+        ])
+
+    # PRE: <function> is a function without parameters
+    # POST: Returns the best time in seconds of <repeats> calls to <function>
+    def __best(self, function):
+        best = None
+        for _ in range(max(1, self.__repeats)):
+            started = time.perf_counter()
+            function()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best
+
+    # PRE: <bytecode_cache> is a bytecode cache or None
+    # POST: Loads the templates in a new environment, like a new process does
+    def __load(self, bytecode_cache):
+        environment = Environment(loader=FileSystemLoader(TEMPLATE_DIR),
+                                  bytecode_cache=bytecode_cache, auto_reload=False)
+        environment.get_template("report.html")
+        environment.get_template("step_row.html")
+
+    # PRE: True
+    # POST: Returns the relevant data and the statistics of a synthetic report
+    def __create_report(self):
+        hosts = [HostRecord(paw=f"paw-{number}", host=f"host-{number}", group="client",
+                            platform="windows", ip=f"10.0.0.{number}", privilege="Elevated")
+                 for number in range(10)]
+        steps = [StepRecord(host=f"host-{index % 10}", ip=f"10.0.0.{index % 10}",
+                            group="client", name=f"Ability {index % 50}",
+                            technique_id=f"T{1000 + index % 50}", command="Y29tbWFuZA==",
+                            plaintext_command="command", platform="windows",
+                            description=f"Description of the ability {index % 50}",
+                            output="x" * 200, status="Success" if index % 2 else "Failed",
+                            ability_id=f"ability-{index % 50}")
+                 for index in range(self.__steps)]
+        data = {"name": "Render", "group": ["client"], "hosts": hosts, "steps": steps,
+                "whitelist_version": None}
+        stats = {"total": self.__steps, "successful": self.__steps // 2, "success_rate": 50.0,
+                 "host_stats": {}, "group_stats": {}, "technique_stats": {}}
+        return data, stats
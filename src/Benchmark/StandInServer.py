@@ -0,0 +1,267 @@
+"""
+Author: 	Gari Arellano
+Date:		18-10-2026
+Project: 	Atlassian
+Filename:	StandInServer.py
+Description:
+  This file contains the StandInServer class, a local stand-in of the Caldera, Jira, Confluence
+  and GitLab endpoints used by the service, built on the aiohttp test server. It serves
+  synthetic operations and can add latency, errors and 429 responses, so the service can be
+  load tested without touching the production servers.
+"""
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+import asyncio
+import base64
+import hashlib
+import io
+import random
+import re
+import zipfile
+
+class StandInServer:
+    # PRE: <operations> is the number of synthetic operations
+    #      <hosts> is the number of agents (hosts) of each operation
+    #      <steps> is the number of steps executed in each host
+    #      <output_size> is the number of bytes of the stdout of each step
+    #      <latency> is the number of seconds added to each response
+    #      <error_rate> is the probability of answering a request with a 503 error
+    #      <rate_limit_rate> is the probability of answering a request with a 429 error
+    #      <retry_after> is the value of the Retry-After header of the 429 responses
+    #      <group> is the group (client) of the agents
+    #      <whitelist> is the list of ability ids in the whitelist of <group>
+    def __init__(self, operations=10, hosts=2, steps=20, output_size=200, latency=0.0,
+                 error_rate=0.0, rate_limit_rate=0.0, retry_after=0.1, group="client",
+                 whitelist=None):
+        self.__hosts = hosts
+        self.__steps = steps
+        self.__output_size = output_size
+        self.__latency = latency
+        self.__error_rate = error_rate
+        self.__rate_limit_rate = rate_limit_rate
+        self.__retry_after = retry_after
+        self.__group = group
+        self.__whitelist = whitelist if whitelist is not None else ["ability-0"]
+        self.__operations = {}
+        for number in range(operations):
+            operation = self.__create_operation(number)
+            self.__operations[operation["summary"]["id"]] = operation
+        self.__issues = []
+        self.__pages = []
+        self.__attachments = []
+        self.__deleted = []
+        self.__requests = 0
+        self.__injected_errors = 0
+        self.__server = None
+
+    # PRE: True
+    # POST: Starts the server on a free local port
+    async def start(self):
+        app = web.Application(middlewares=[self.__inject_faults], client_max_size=1024 ** 3)
+        app.router.add_get("/api/v2/operations", self.__get_operations)
+        app.router.add_post("/api/v2/operations/{id}/report", self.__get_report)
+        app.router.add_post("/api/v2/operations/{id}/event-logs", self.__get_event_logs)
+        app.router.add_delete("/api/v2/operations/{id}", self.__delete_operation)
+        app.router.add_post("/jira/rest/api/3/issue", self.__create_issue)
+        app.router.add_get("/jira/rest/api/3/search/jql", self.__search_issues)
+        app.router.add_post("/wiki/api/v2/pages", self.__create_page)
+        app.router.add_get("/wiki/api/v2/pages", self.__search_pages)
+        app.router.add_put("/wiki/rest/api/content/{id}/child/attachment",
+                           self.__create_attachment)
+        app.router.add_get("/gitlab/archive.zip", self.__get_archive)
+        self.__server = TestServer(app, host="127.0.0.1")
+        await self.__server.start_server()
+        return self
+
+    # PRE: True
+    # POST: Stops the server
+    async def close(self):
+        if self.__server is not None:
+            await self.__server.close()
+            self.__server = None
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    # PRE: The server is started
+    # POST: Returns a dictionary with the environment variables that point the service to
+    #       this server
+    def env(self):
+        base = f"http://127.0.0.1:{self.__server.port}"
+        return {
+            "caldera_server": f"127.0.0.1:{self.__server.port}",
+            "api_key": "stand-in",
+            "atlassian_url": base + "/wiki/api/v2/pages",
+            "atlassian_email": "stand-in@example.com",
+            "atlassian_token": "stand-in",
+            "confluence_space_id": "1",
+            "confluence_father_id": "1",
+            "gitlab_token": "stand-in",
+            "gitlab_url": base + "/gitlab/archive.zip",
+            "jira_url": base + "/jira/rest/api/3/issue",
+            "jira_issue_type": "1",
+            "jira_project_id": "1",
+            "jira_title": "Stand-in"
+        }
+
+    # PRE: True
+    # POST: Returns a dictionary with the counters of the server
+    def counters(self):
+        return {
+            "requests": self.__requests,
+            "injected_errors": self.__injected_errors,
+            "issues": len(self.__issues),
+            "pages": len(self.__pages),
+            "attachments": len(self.__attachments),
+            "deleted": len(self.__deleted),
+            "pending_operations": len(self.__operations)
+        }
+
+    # PRE: <number> is the number of the operation
+    # POST: Returns a dictionary with a synthetic operation: its summary for the listing, the
+    #       report and the event logs
+    def __create_operation(self, number):
+        operation_id = f"operation-{number}"
+        command = "whoami"
+        host_group = []
+        steps = {}
+        event_logs = []
+        for host in range(self.__hosts):
+            paw = f"paw-{number}-{host}"
+            host_group.append({
+                "paw": paw,
+                "host": f"host-{host}",
+                "group": self.__group,
+                "platform": "linux",
+                "host_ip_addrs": [f"10.0.{number % 256}.{host % 256}"],
+                "privilege": "User"
+            })
+            steps[paw] = {"steps": []}
+            for step in range(self.__steps):
+                pid = number * 1000000 + host * 1000 + step
+                steps[paw]["steps"].append({
+                    "name": f"Step {step}",
+                    "attack": {"technique_id": f"T{1000 + step % 50}"},
+                    "command": base64.b64encode(command.encode()).decode(),
+                    "plaintext_command": command,
+                    "platform": "linux",
+                    "description": f"Synthetic step {step}",
+                    "pid": pid,
+                    "status": step % 2,
+                    "ability_id": f"ability-{step % 10}"
+                })
+                event_logs.append({
+                    "pid": pid,
+                    "output": {"stdout": "x" * self.__output_size, "stderr": "", "exit_code": "0"}
+                })
+        return {
+            "summary": {
+                "id": operation_id,
+                "name": f"Operation {number}",
+                "state": "finished",
+                "start": "2026-01-01T00:00:00Z",
+                "finish": "2026-01-01T01:00:00Z",
+                "host_group": host_group
+            },
+            "report": {
+                "name": f"Operation {number}",
+                "host_group": host_group,
+                "steps": steps
+            },
+            "event_logs": event_logs
+        }
+
+    # Middleware that adds the latency and the injected errors to every request
+    @web.middleware
+    async def __inject_faults(self, request, handler):
+        self.__requests += 1
+        if self.__latency:
+            await asyncio.sleep(self.__latency)
+        draw = random.random()
+        if draw < self.__rate_limit_rate:
+            self.__injected_errors += 1
+            return web.Response(status=429, headers={"Retry-After": str(self.__retry_after)})
+        if draw < self.__rate_limit_rate + self.__error_rate:
+            self.__injected_errors += 1
+            return web.Response(status=503, text="Injected error")
+        return await handler(request)
+
+    async def __get_operations(self, request):
+        return web.json_response([operation["summary"] for operation in
+                                  self.__operations.values()])
+
+    async def __get_report(self, request):
+        operation = self.__operations.get(request.match_info["id"])
+        if operation is None:
+            raise web.HTTPNotFound()
+        return web.json_response(operation["report"])
+
+    async def __get_event_logs(self, request):
+        operation = self.__operations.get(request.match_info["id"])
+        if operation is None:
+            raise web.HTTPNotFound()
+        return web.json_response(operation["event_logs"])
+
+    async def __delete_operation(self, request):
+        operation_id = request.match_info["id"]
+        if self.__operations.pop(operation_id, None) is None:
+            raise web.HTTPNotFound()
+        self.__deleted.append(operation_id)
+        return web.Response(status=204)
+
+    async def __create_issue(self, request):
+        body = await request.json()
+        key = f"STAND-{len(self.__issues) + 1}"
+        self.__issues.append({"id": str(len(self.__issues) + 1), "key": key,
+                              "fields": {"summary": body["fields"]["summary"],
+                                         "labels": body["fields"].get("labels", [])}})
+        return web.json_response({"id": self.__issues[-1]["id"], "key": key}, status=201)
+
+    async def __search_issues(self, request):
+        # Only the label search of the idempotency check is supported
+        match = re.search(r'labels = "([^"]+)"', request.query.get("jql", ""))
+        issues = [issue for issue in self.__issues
+                  if match and match.group(1) in issue["fields"]["labels"]]
+        return web.json_response({"issues": issues})
+
+    async def __create_page(self, request):
+        body = await request.json()
+        # Confluence doesn't allow two pages with the same title in a space
+        if any(page["title"] == body["title"] and page["spaceId"] == body["spaceId"]
+               for page in self.__pages):
+            return web.json_response({"message": "A page with this title already exists"},
+                                     status=400)
+        page = {"id": str(len(self.__pages) + 1), "title": body["title"],
+                "spaceId": body["spaceId"]}
+        self.__pages.append(page)
+        return web.json_response(page)
+
+    async def __search_pages(self, request):
+        title = request.query.get("title")
+        return web.json_response({"results": [page for page in self.__pages
+                                              if page["title"] == title]})
+
+    async def __create_attachment(self, request):
+        reader = await request.multipart()
+        part = await reader.next()
+        content = await part.read()
+        page_id = request.match_info["id"]
+        self.__attachments[:] = [attachment for attachment in self.__attachments
+                                 if attachment[:2] != (page_id, part.filename)]
+        self.__attachments.append((page_id, part.filename, len(content)))
+        return web.json_response({"results": [{"title": part.filename}]})
+
+    async def __get_archive(self, request):
+        content = io.BytesIO()
+        with zipfile.ZipFile(content, "w") as archive:
+            archive.writestr(f"caldera-whitelist-master/{self.__group}",
+                             "\n".join(self.__whitelist) + "\n")
+        etag = '"' + hashlib.sha1(content.getvalue()).hexdigest() + '"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(body=content.getvalue(), content_type="application/zip",
+                            headers={"ETag": etag})
@@ -0,0 +1,6 @@
+from .StandInServer import StandInServer
+from .Benchmark import Benchmark
+from .RecordMemory import RecordMemory
+from .RenderBenchmark import RenderBenchmark
+
+__all__ = ['StandInServer', 'Benchmark', 'RecordMemory', 'RenderBenchmark']
\ No newline at end of file
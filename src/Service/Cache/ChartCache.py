@@ -0,0 +1,126 @@
+"""
+Author: 	Gari Arellano
+Date:		18-10-2026
+Project: 	Atlassian
+Filename:	ChartCache.py
+Description:
+  This file contains the ChartCache class, a bounded cache of the rendered charts of the
+  reports. Many operations have the same charts (0% or 100% success, the same rates per
+  host), so the charts are kept by a digest of the values they draw and rendered only once.
+  The most recently used charts are kept in memory and, optionally, in a directory so they are
+  reused by the next runs.
+"""
+
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import logging
+
+logger = logging.getLogger('test_report')
+
+class ChartCache:
+    # PRE: <max_entries> is the maximum number of charts kept in memory (and in the directory)
+    #      <directory> is an optional directory where the charts are saved between runs
+    def __init__(self, max_entries=256, directory=None):
+        self.__max_entries = max_entries
+        self.__directory = directory
+        self.__charts = OrderedDict()
+        self.__hits = 0
+        self.__disk_hits = 0
+        self.__misses = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    # PRE: <values> are the values drawn by a chart and its parameters (JSON serializable)
+    # POST: Returns the digest that identifies the chart
+    @staticmethod
+    def key(*values):
+        return hashlib.sha256(json.dumps(values).encode("utf-8")).hexdigest()
+
+    # PRE: <key> is a digest returned by key()
+    # POST: Returns the chart, or None if it is not in the cache
+    def get(self, key):
+        chart = self.__charts.get(key)
+        if chart is not None:
+            self.__charts.move_to_end(key)
+            self.__hits += 1
+            return chart
+        chart = self.__read(key)
+        if chart is not None:
+            self.__disk_hits += 1
+            self.__remember(key, chart)
+            return chart
+        self.__misses += 1
+        return None
+
+    # PRE: <key> is a digest returned by key() and <chart> the rendered chart
+    # POST: Saves the chart in memory and in the directory, if any
+    def put(self, key, chart):
+        self.__remember(key, chart)
+        if self.__directory:
+            try:
+                self.__write(key, chart)
+            except OSError as e:
+                # The directory is only an optimization, the chart is still in memory
+                logger.warning(f"Error saving chart {key} in {self.__directory}: {str(e)}")
+
+    # PRE: True
+    # POST: Returns a dictionary with the hits (in memory and in the directory), the misses,
+    #       the hit rate and the number of charts in memory
+    def get_stats(self):
+        lookups = self.__hits + self.__disk_hits + self.__misses
+        return {
+            "hits": self.__hits,
+            "disk_hits": self.__disk_hits,
+            "misses": self.__misses,
+            "hit_rate": (self.__hits + self.__disk_hits) / lookups * 100 if lookups else 0,
+            "entries": len(self.__charts)
+        }
+
+    # PRE: <key> is a digest and <chart> its chart
+    # POST: Saves the chart in memory, dropping the least recently used one if it is full
+    def __remember(self, key, chart):
+        if self.__max_entries <= 0:
+            return
+        self.__charts[key] = chart
+        self.__charts.move_to_end(key)
+        if len(self.__charts) > self.__max_entries:
+            self.__charts.popitem(last=False)
+
+    # PRE: <key> is a digest
+    # POST: Returns the chart saved in the directory, or None
+    def __read(self, key):
+        if not self.__directory:
+            return None
+        path = self.__path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                chart = file.read()
+        except OSError:
+            return None
+        # The modification time is the last use, for the eviction of __write
+        os.utime(path)
+        return chart
+
+    # PRE: <key> is a digest and <chart> its chart
+    # POST: Saves the chart in the directory and removes the least recently used charts over
+    #       <max_entries>
+    def __write(self, key, chart):
+        path = self.__path(key)
+        # The file is written aside and renamed, so a crash never leaves half a chart
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            file.write(chart)
+        os.replace(temporary, path)
+        files = [os.path.join(self.__directory, name) for name in os.listdir(self.__directory)
+                 if name.endswith(".chart")]
+        if len(files) > self.__max_entries:
+            files.sort(key=os.path.getmtime)
+            for old in files[:len(files) - self.__max_entries]:
+                os.remove(old)
+
+    # PRE: <key> is a digest
+    # POST: Returns the path of the file of the chart
+    def __path(self, key):
+        return os.path.join(self.__directory, f"{key}.chart")
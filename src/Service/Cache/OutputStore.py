@@ -0,0 +1,98 @@
+"""
+Author: 	Gari Arellano
+Date:		18-10-2026
+Project: 	Atlassian
+Filename:	OutputStore.py
+Description:
+  This file contains the OutputStore class which applies the output policy of the steps: the
+  outputs up to <preview_bytes> are kept inline, and the bigger ones are cut to a preview and
+  their full content is spilled to a local compressed store. The report only keeps a reference
+  to the full output, which is loaded from disk when it is needed (for example to upload it to
+  Confluence as an attachment), so the big outputs are not copied into every step, page and
+  ticket. The outputs not used for a while are removed by prune.
+"""
+
+import gzip
+import hashlib
+import os
+import time
+import logging
+
+logger = logging.getLogger('test_report')
+
+class OutputStore:
+    # PRE: <directory> is the directory of the store. It is created if it doesn't exist.
+    #      <preview_bytes> is the maximum number of bytes of an output kept inline
+    def __init__(self, directory="output_store", preview_bytes=16384):
+        self.__directory = directory
+        self.__preview_bytes = preview_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def getPreviewBytes(self):
+        return self.__preview_bytes
+
+    # PRE: <output> is the stdout of a step
+    # POST: Returns a tuple (preview, reference, size). If the output fits in the preview,
+    #       it is returned as it is with reference None. Otherwise, the full output is saved
+    #       in the store and the preview is its first <preview_bytes> bytes.
+    #       <size> is the size of the full output in bytes.
+    def spill(self, output):
+        content = output.encode("utf-8")
+        if len(content) <= self.__preview_bytes:
+            return output, None, len(content)
+        reference = hashlib.sha256(content).hexdigest()[:32]
+        path = self.__path(reference)
+        if os.path.exists(path):
+            # The modification time is the last use, for prune
+            os.utime(path)
+        else:
+            # The file is written aside and renamed, so a crash never leaves half an output
+            temporary = f"{path}.{os.getpid()}.tmp"
+            with open(temporary, "wb") as file:
+                file.write(gzip.compress(content))
+            os.replace(temporary, path)
+            logger.debug(f"Output of {len(content)} bytes spilled to {path}")
+        # A multi-byte character cut by the limit is dropped
+        preview = content[:self.__preview_bytes].decode("utf-8", errors="ignore")
+        return preview, reference, len(content)
+
+    # PRE: <reference> is a reference returned by spill
+    # POST: Returns the full output in bytes. Raises FileNotFoundError if it is not in the
+    #       store.
+    def load(self, reference):
+        with open(self.__path(reference), "rb") as file:
+            return gzip.decompress(file.read())
+
+    # PRE: <max_age> is a number of seconds
+    # POST: Removes the outputs that were not spilled in the last <max_age> seconds and returns
+    #       the number of removed outputs. The outputs are shared by all the operations with the
+    #       same output, so they are removed by age and not when a page is published.
+    def prune(self, max_age):
+        limit = time.time() - max_age
+        removed = 0
+        for name in os.listdir(self.__directory):
+            if not name.endswith(".txt.gz"):
+                continue
+            path = os.path.join(self.__directory, name)
+            try:
+                if os.path.getmtime(path) < limit:
+                    os.remove(path)
+                    removed += 1
+            except OSError as e:
+                # Another process may have removed it
+                logger.debug(f"Error removing the output {path}: {str(e)}")
+        if removed:
+            logger.info(f"{removed} outputs older than {max_age} seconds removed from "
+                        f"{self.__directory}")
+        return removed
+
+    # PRE: <reference> is a reference returned by spill
+    # POST: Returns the name of the attachment with the full output in the report
+    @staticmethod
+    def attachment_name(reference):
+        return f"output-{reference}.txt"
+
+    # PRE: <reference> is a reference returned by spill
+    # POST: Returns the path of the file of the output
+    def __path(self, reference):
+        return os.path.join(self.__directory, f"{reference}.txt.gz")
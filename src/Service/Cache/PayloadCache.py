@@ -0,0 +1,217 @@
+"""
+Author: 	Gari Arellano
+Date:		18-10-2026
+Project: 	Atlassian
+Filename:	PayloadCache.py
+Description:
+  This file contains the PayloadCache class which keeps on disk the raw responses of Caldera
+  (the report and the event logs of each operation). The operations are deleted from Caldera
+  once they are published, so this cache is the only way to render their report again after
+  a change in the template or in the whitelist.
+  The payloads are stored once by the SHA-256 of their content (two operations with the same
+  event logs share the file) and an SQLite index maps each operation to its payloads. When the
+  cache grows over its maximum size, the least recently used payloads are evicted.
+  The payloads can be saved from a thread of the executor, so the serialization and the
+  compression don't block the event loop.
+"""
+
+import datetime
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import logging
+
+logger = logging.getLogger('test_report')
+
+class PayloadCache:
+    # Kinds of payloads of an operation
+    KINDS = ["inform", "event_logs"]
+
+    # PRE: <directory> is the directory of the cache. It is created if it doesn't exist.
+    #      <max_bytes> is the maximum size of the stored payloads (compressed), None for no limit
+    # POST: Opens the index of the cache and creates its tables if they don't exist.
+    def __init__(self, directory="payload_cache", max_bytes=512 * 1024 * 1024):
+        logger.info(f"Initializing PayloadCache class in {directory}")
+        self.__directory = directory
+        self.__max_bytes = max_bytes
+        os.makedirs(os.path.join(directory, "blobs"), exist_ok=True)
+        # The index is used from the threads that save the payloads, one at a time
+        self.__connection = sqlite3.connect(os.path.join(directory, "index.sqlite3"),
+                                            check_same_thread=False)
+        self.__lock = threading.RLock()
+        self.__connection.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                operation_id TEXT,
+                kind         TEXT,
+                hash         TEXT,
+                name         TEXT,
+                stored_at    TEXT,
+                PRIMARY KEY (operation_id, kind)
+            );
+            CREATE TABLE IF NOT EXISTS blobs (
+                hash         TEXT PRIMARY KEY,
+                size         INTEGER,
+                accessed_at  REAL
+            );
+        """)
+        self.__connection.commit()
+        logger.info("PayloadCache initialized successfully")
+
+    # PRE: True
+    # POST: Closes the index of the cache.
+    def close(self):
+        self.__connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # PRE: <operation_id> is a string that represents the id of the operation
+    #      <kind> is one of the KINDS
+    #      <payload> is the JSON payload returned by Caldera
+    #      <name> is an optional string with the name of the operation
+    # POST: Saves the payload and returns its hash. The payloads are evicted if the cache is
+    #       over its maximum size.
+    def put(self, operation_id, kind, payload, name=None):
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown payload kind: {kind}")
+        content = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        digest = hashlib.sha256(content).hexdigest()
+        path = self.__blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # The file is written aside and renamed, so a crash never leaves half a payload
+            temporary = f"{path}.{os.getpid()}.tmp"
+            with open(temporary, "wb") as file:
+                file.write(gzip.compress(content))
+            os.replace(temporary, path)
+        with self.__lock:
+            self.__index(operation_id, kind, digest, path, name)
+        return digest
+
+    # PRE: <operation_id>, <kind> and <name> are the same as in put
+    #      <digest> and <path> are the hash and the file of the payload
+    # POST: Saves the payload in the index and evicts the payloads over the maximum size
+    def __index(self, operation_id, kind, digest, path, name):
+        self.__connection.execute(
+            """INSERT INTO blobs (hash, size, accessed_at) VALUES (?, ?, ?)
+               ON CONFLICT(hash) DO UPDATE SET accessed_at = excluded.accessed_at""",
+            (digest, os.path.getsize(path), self.__clock())
+        )
+        self.__connection.execute(
+            """INSERT INTO entries (operation_id, kind, hash, name, stored_at)
+               VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT(operation_id, kind) DO UPDATE SET
+                   hash = excluded.hash,
+                   name = COALESCE(excluded.name, entries.name),
+                   stored_at = excluded.stored_at""",
+            (operation_id, kind, digest, name,
+             datetime.datetime.now().isoformat(timespec="seconds"))
+        )
+        self.__connection.commit()
+        self.__evict()
+
+    # PRE: <operation_id> is a string that represents the id of the operation
+    #      <inform> and <event_logs> are the report and the event logs of the operation
+    #      <name> is an optional string with the name of the operation
+    # POST: Saves the report and the event logs of the operation.
+    def put_bundle(self, operation_id, inform, event_logs, name=None):
+        self.put(operation_id, "inform", inform, name)
+        self.put(operation_id, "event_logs", event_logs, name)
+
+    # PRE: <operation_id> is a string that represents the id of the operation
+    #      <kind> is one of the KINDS
+    # POST: Returns the saved payload, or None if it is not in the cache.
+    def get(self, operation_id, kind):
+        row = self.__connection.execute(
+            "SELECT hash FROM entries WHERE operation_id = ? AND kind = ?",
+            (operation_id, kind)
+        ).fetchone()
+        if not row:
+            return None
+        try:
+            with open(self.__blob_path(row[0]), "rb") as file:
+                content = gzip.decompress(file.read())
+        except FileNotFoundError:
+            logger.warning(f"Payload {kind} of operation {operation_id} is missing in the cache")
+            return None
+        self.__connection.execute(
+            "UPDATE blobs SET accessed_at = ? WHERE hash = ?", (self.__clock(), row[0])
+        )
+        self.__connection.commit()
+        return json.loads(content)
+
+    # PRE: <operation_id> is a string that represents the id of the operation
+    # POST: Returns a tuple (inform, event_logs) with the payloads of the operation, or
+    #       (None, None) if any of them is not in the cache.
+    def get_bundle(self, operation_id):
+        inform = self.get(operation_id, "inform")
+        event_logs = self.get(operation_id, "event_logs")
+        if inform is None or event_logs is None:
+            return None, None
+        return inform, event_logs
+
+    # PRE: True
+    # POST: Returns a list of dictionaries with the id and the name of the operations that have
+    #       all their payloads in the cache, the most recent first.
+    def operations(self):
+        rows = self.__connection.execute(
+            """SELECT operation_id, MAX(name), MAX(stored_at) FROM entries
+               GROUP BY operation_id HAVING COUNT(*) = ?
+               ORDER BY MAX(stored_at) DESC""",
+            (len(self.KINDS),)
+        ).fetchall()
+        return [{"id": row[0], "name": row[1]} for row in rows]
+
+    # PRE: True
+    # POST: Returns the size in bytes of the stored payloads.
+    def size(self):
+        return self.__connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM blobs"
+        ).fetchone()[0]
+
+    # PRE: True
+    # POST: Deletes the least recently used payloads (and the entries that point to them)
+    #       until the cache is not over its maximum size.
+    def evict(self):
+        with self.__lock:
+            self.__evict()
+
+    # PRE: The lock of the index is held
+    # POST: The same as evict
+    def __evict(self):
+        if self.__max_bytes is None:
+            return
+        total = self.size()
+        if total <= self.__max_bytes:
+            return
+        rows = self.__connection.execute(
+            "SELECT hash, size FROM blobs ORDER BY accessed_at"
+        ).fetchall()
+        for digest, size in rows:
+            if total <= self.__max_bytes:
+                break
+            try:
+                os.remove(self.__blob_path(digest))
+            except FileNotFoundError:
+                pass
+            self.__connection.execute("DELETE FROM blobs WHERE hash = ?", (digest,))
+            self.__connection.execute("DELETE FROM entries WHERE hash = ?", (digest,))
+            total -= size
+            logger.debug(f"Payload {digest} evicted from the cache")
+        self.__connection.commit()
+
+    # PRE: <digest> is the hash of a payload
+    # POST: Returns the path of the file of the payload
+    def __blob_path(self, digest):
+        return os.path.join(self.__directory, "blobs", digest[:2], f"{digest}.json.gz")
+
+    # PRE: True
+    # POST: Returns the current time, used to order the payloads by their last use
+    def __clock(self):
+        return datetime.datetime.now().timestamp()
@@ -0,0 +1,5 @@
+from .PayloadCache import PayloadCache
+from .OutputStore import OutputStore
+from .ChartCache import ChartCache
+
+__all__ = ['PayloadCache', 'OutputStore', 'ChartCache']
\ No newline at end of file
@@ -4,19 +4,36 @@ Date:		12-03-2025
 Project: 	Atlassian
 Filename:	CalderaApi.py
 Description:
-  This file contains the CalderaApi base class which is used as a base class to interact 
+  This file contains the CalderaApi base class which is used as a base class to interact
   with the MITRE Caldera API.
   MITRE Caldera Api has many groups of endpoints and each group has its own class, this class
   is the base class for all the groups.
+  The class owns one HttpClient (pooled keep-alive connections, retries and rate limit) that
+  every subclass reuses, so we don't pay a new TCP connection for each request.
 """
 
 from abc import ABC, abstractmethod
+from ...Http import HttpClient
+
 class CalderaApi(ABC):
-    def __init__(self, server, api_key):
+    # PRE: <server> is a string with the host (and port) of the Caldera server
+    #      <api_key> is a string with the Caldera API key
+    #      <limit> is the maximum number of simultaneous connections of the pool
+    #      <limit_per_host> is the maximum number of simultaneous connections to the same host
+    #      <keepalive_timeout> is the number of seconds an idle connection is kept open
+    # POST: Initializes the API without opening the session. The session is opened with
+    #       open() (or "async with") or lazily on the first request.
+    def __init__(self, server, api_key, limit=100, limit_per_host=10, keepalive_timeout=30):
         self.__url = f"http://{server}/api/v2"
         self.__headers = {
             "KEY": api_key
         }
+        self.__client = HttpClient(
+            "caldera",
+            limit=limit,
+            limit_per_host=limit_per_host,
+            keepalive_timeout=keepalive_timeout
+        )
 
     def setUrl(self, url):
         self.__url = url
@@ -26,10 +43,38 @@ class CalderaApi(ABC):
 
     def getUrl(self):
         return self.__url
-    
+
     def getHeaders(self):
         return self.__headers
-    
+
+    # PRE: True
+    # POST: Returns the HttpClient shared by all the requests of the API.
+    def getClient(self):
+        return self.__client
+
+    # PRE: True
+    # POST: Returns the shared session of the API. If the session is not open yet (or it was
+    #       closed), a new one is created.
+    def getSession(self):
+        return self.__client.getSession()
+
+    # PRE: True
+    # POST: Opens the shared session of the API.
+    async def open(self):
+        await self.__client.open()
+        return self
+
+    # PRE: True
+    # POST: Closes the shared session of the API and all its pooled connections.
+    async def close(self):
+        await self.__client.close()
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
     """@abstractmethod
     def make_request(self, enpoint):
-        pass"""
\ No newline at end of file
+        pass"""
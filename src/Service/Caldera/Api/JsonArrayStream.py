@@ -0,0 +1,101 @@
+"""
+Author: 	Gari Arellano
+Date:		18-10-2026
+Project: 	Atlassian
+Filename:	JsonArrayStream.py
+Description:
+  This file contains the JsonArrayStream class which parses a JSON array incrementally from a
+  stream of bytes (for example the body of an aiohttp response). The elements of the array are
+  yielded one at a time, so the whole response is never held in memory.
+"""
+
+import codecs
+import json
+
+class JsonArrayStream:
+    WHITESPACE = " \t\r\n"
+    DELIMITERS = WHITESPACE + ",]"
+
+    # PRE: <chunks> is an async iterator of bytes with the UTF-8 encoded JSON array
+    # POST: Initializes the stream without reading from <chunks>
+    def __init__(self, chunks):
+        self.__chunks = chunks.__aiter__()
+        self.__decoder = json.JSONDecoder()
+        self.__text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self.__buffer = ""
+        self.__position = 0
+        self.__eof = False
+
+    # PRE: True
+    # POST: Yields the elements of the JSON array one at a time.
+    #       Raises json.JSONDecodeError if the stream is not a valid JSON array.
+    async def items(self):
+        if await self.__next_char() != "[":
+            raise json.JSONDecodeError("Expected a JSON array", self.__buffer, self.__position)
+        self.__position += 1
+        if await self.__next_char() == "]":
+            return
+
+        while True:
+            yield await self.__decode_value()
+            char = await self.__next_char()
+            if char == ",":
+                self.__position += 1
+                await self.__next_char()
+            elif char == "]":
+                return
+            else:
+                raise json.JSONDecodeError(
+                    "Expected ',' or ']' after an array element", self.__buffer, self.__position
+                )
+
+    # PRE: The buffer position is at the start of a JSON value
+    # POST: Returns the decoded value and moves the buffer position after it
+    async def __decode_value(self):
+        while True:
+            try:
+                value, end = self.__decoder.raw_decode(self.__buffer, self.__position)
+                # Numbers are not self-delimiting ("1.5e" is decoded as 1.5), so the value is
+                # only complete when it is followed by a delimiter
+                if self.__eof or (end < len(self.__buffer) and
+                                  self.__buffer[end] in self.DELIMITERS):
+                    self.__position = end
+                    return value
+            except json.JSONDecodeError:
+                if self.__eof:
+                    raise
+            # The value is incomplete. The pending part is at least doubled before trying
+            # again, so a big value is not parsed again for every chunk.
+            pending = len(self.__buffer) - self.__position
+            while len(self.__buffer) - self.__position < 2 * pending:
+                if not await self.__read_more():
+                    break
+
+    # PRE: True
+    # POST: Skips the whitespace and returns the next character of the stream without
+    #       consuming it, or None at the end of the stream
+    async def __next_char(self):
+        while True:
+            while (self.__position < len(self.__buffer) and
+                   self.__buffer[self.__position] in self.WHITESPACE):
+                self.__position += 1
+            if self.__position < len(self.__buffer):
+                return self.__buffer[self.__position]
+            if not await self.__read_more():
+                return None
+
+    # PRE: True
+    # POST: Appends the next chunk of the stream to the buffer, dropping the part that has
+    #       already been consumed. Returns False at the end of the stream.
+    async def __read_more(self):
+        if self.__eof:
+            return False
+        try:
+            chunk = await self.__chunks.__anext__()
+            text = self.__text_decoder.decode(chunk)
+        except StopAsyncIteration:
+            text = self.__text_decoder.decode(b"", final=True)
+            self.__eof = True
+        self.__buffer = self.__buffer[self.__position:] + text
+        self.__position = 0
+        return not self.__eof or bool(text)
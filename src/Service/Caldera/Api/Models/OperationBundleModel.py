@@ -0,0 +1,40 @@
+"""
+Author: 	Gari Arellano
+Date:		18-10-2026
+Project: 	Atlassian
+Filename:	OperationBundleModel.py
+Description:
+  This file contains the OperationBundleModel class which groups the report and the event logs
+  of one operation of the MITRE Caldera, as they are returned by the Caldera API.
+"""
+
+class OperationBundleModel:
+    def __init__(self, operation_id="", inform=None, event_logs=None):
+        self.operation_id = operation_id
+        self.inform = inform if inform is not None else {}
+        self.event_logs = event_logs if event_logs is not None else []
+
+    # Setters
+    def set_operation_id(self, operation_id):
+        self.operation_id = operation_id
+    def set_inform(self, inform):
+        self.inform = inform
+    def set_event_logs(self, event_logs):
+        self.event_logs = event_logs
+
+    # Getters
+    def get_operation_id(self):
+        return self.operation_id
+    def get_inform(self):
+        return self.inform
+    def get_event_logs(self):
+        return self.event_logs
+
+    # PRE: None
+    # POST: Returns a dictionary with the bundle information
+    def to_dict(self):
+        return {
+            "operation_id": self.operation_id,
+            "inform": self.inform,
+            "event_logs": self.event_logs
+        }
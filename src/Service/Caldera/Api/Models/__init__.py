@@ -1,4 +1,5 @@
 from .OperationModel import OperationModel
 from .AdversaryModel import AdversaryModel
+from .OperationBundleModel import OperationBundleModel
 
-__all__ = ['OperationModel', 'AdversaryModel']
\ No newline at end of file
+__all__ = ['OperationModel', 'AdversaryModel', 'OperationBundleModel']
\ No newline at end of file
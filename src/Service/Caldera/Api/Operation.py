@@ -9,21 +9,41 @@ Description:
 """
 
 import aiohttp
+import asyncio
 import json
 import uuid
 from .Models.OperationModel import OperationModel
 from .Models.AdversaryModel import AdversaryModel
+from .Models.OperationBundleModel import OperationBundleModel
 from .CalderaApi import CalderaApi
+from .JsonArrayStream import JsonArrayStream
+from .OperationIndex import OperationIndex
 from datetime import datetime, timedelta
 import logging
 
 logger = logging.getLogger('test_report')
 
 class Operation(CalderaApi):
-    def __init__(self, server, api_key):
+    # Size of the chunks read from the response when the event logs are streamed
+    STREAM_CHUNK_SIZE = 64 * 1024
+
+    # States of the operations that are still running and will change. The other states
+    # (finished, out_of_time, cleanup...) are final.
+    ACTIVE_STATES = ("running", "paused", "run_one_link")
+
+    # PRE: <stream_event_logs> is True if the event logs have to be parsed incrementally from
+    #      the response, keeping only the fields needed by the report (pid and stdout)
+    def __init__(self, server, api_key, limit=100, limit_per_host=10, stream_event_logs=False):
       logger.info("Initializing Operation class")
-      super().__init__(server, api_key)
+      super().__init__(server, api_key, limit=limit, limit_per_host=limit_per_host)
       self._endpoint = "/operations"
+      self.__stream_event_logs = stream_event_logs
+      # High-water mark of the discovery: start time from which the operations are examined
+      # and ids of the operations already returned (with the start time of each one)
+      self.__cursor_time = None
+      self.__cursor_ids = {}
+      # Ids of the operations that have to be returned again although they are behind the mark
+      self.__retry_ids = set()
       logger.info(f"Operation endpoint set to: {self._endpoint}")
     
     # PRE: True
@@ -31,6 +51,11 @@ class Operation(CalderaApi):
     def getEndpoint(self):
       return self._endpoint
 
+    # PRE: True
+    # POST: Returns True if the event logs are parsed incrementally (iter_event_logs)
+    def getStreamEventLogs(self):
+      return self.__stream_event_logs
+
     # PRE: <operationId> is a string that represents the id of the operation
     # POST: Returns the report of the operation with id = <operationId>
     async def get_inform(self, operationId):
@@ -45,125 +70,252 @@ class Operation(CalderaApi):
 
     # PRE: <operationId> is a string that represents the id of the operation
     # POST: Returns the event-logs of the operation with id = <operationId>
+    #       In streaming mode only the pid and the stdout of each entry are returned, but all
+    #       of them are kept in the list. To index them without keeping them, use
+    #       iter_event_logs.
     async def get_event_logs(self, operationId):
         logger.info(f"Requesting event logs for operation ID: {operationId}")
         try:
-            result = await self.__get_operation_results("event-logs", operationId)
+            if self.__stream_event_logs:
+                result = [entry async for entry in self.iter_event_logs(operationId)]
+            else:
+                result = await self.__get_operation_results("event-logs", operationId)
             logger.info(f"Successfully retrieved event logs for operation {operationId}")
             return result
         except Exception as e:
             logger.error(f"Error getting event logs for operation ID {operationId}: {str(e)}")
             raise
         
+    # PRE: <operationId> is a string that represents the id of the operation
+    # POST: Returns an OperationBundleModel with the report and the event-logs of the operation
+    #       with id = <operationId>. Both requests are made at the same time over the shared
+    #       session. If one of them fails the other is cancelled and the first error is raised.
+    async def get_operation_bundle(self, operationId):
+        logger.info(f"Requesting report and event logs for operation ID: {operationId}")
+        try:
+            async with asyncio.TaskGroup() as group:
+                inform = group.create_task(self.get_inform(operationId))
+                event_logs = group.create_task(self.get_event_logs(operationId))
+        except ExceptionGroup as e:
+            raise e.exceptions[0]
+        return OperationBundleModel(operationId, inform.result(), event_logs.result())
+
+    # PRE: <operationId> is a string that represents the id of the operation
+    # POST: Yields the entries of the event-logs of the operation with id = <operationId> one
+    #       at a time, parsed incrementally from the response. Each entry only keeps the fields
+    #       used by the report: {"pid": ..., "output": {"stdout": ...}}, so the memory needed
+    #       is bounded by one entry instead of the whole response.
+    async def iter_event_logs(self, operationId):
+      url = self.getUrl() + self.getEndpoint() + f"/{operationId}/event-logs"
+      logger.debug(f"Streaming event logs from URL: {url}")
+      count = 0
+      try:
+          async with self.getClient().request(
+            "POST",
+            url,
+            idempotent=True,
+            headers=self.getHeaders(),
+            data=json.dumps({"enable_agent_output": True})
+            ) as response:
+              response.raise_for_status()
+              chunks = response.content.iter_chunked(self.STREAM_CHUNK_SIZE)
+              async for entry in JsonArrayStream(chunks).items():
+                  count += 1
+                  yield self.__trim_event_log(entry)
+          logger.debug(f"Streamed {count} event logs of operation {operationId}")
+      except aiohttp.ClientError as e:
+          logger.error(f"Request error streaming event-logs of operation {operationId}: {str(e)}")
+          raise
+      except json.JSONDecodeError as e:
+          logger.error(f"JSON decode error streaming event-logs of operation {operationId}: {str(e)}")
+          raise
+
+    # PRE: <entry> is a dictionary with an entry of the event-logs
+    # POST: Returns a new dictionary with only the pid and the stdout of the entry
+    def __trim_event_log(self, entry):
+      trimmed = {"pid": entry.get("pid")}
+      output = entry.get("output")
+      if isinstance(output, dict):
+          trimmed["output"] = {"stdout": output.get("stdout", "")}
+      return trimmed
+
     # PRE: <typeOfResult> is a string that can be "report" or "event-logs"
     #      <operationId> is a string that represents the id of the operation
     # POST: Returns the <typeOfResult> of the operation with id = <operationId>    
     async def __get_operation_results(self, typeOfResult, operationId):
       url = self.getUrl() + self.getEndpoint() + f"/{operationId}/{typeOfResult}"
       logger.debug(f"Making request to URL: {url}")
-      async with aiohttp.ClientSession() as session:
-        try:
-            async with session.post(
-              url, 
-              headers=self.getHeaders(),
-              data=json.dumps({"enable_agent_output": True})
-              ) as response:
-                response.raise_for_status()
-                result = await response.json()
-                logger.debug(f"Successfully received response for {typeOfResult} of operation {operationId}")
-                return result
-        except aiohttp.ClientError as e:
-            logger.error(f"Request error for {typeOfResult} of operation {operationId}: {str(e)}")
-            raise
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON decode error for {typeOfResult} of operation {operationId}: {str(e)}")
-            raise
+      # The client is shared by all the requests (keep-alive connections and retries).
+      # These POSTs only read the operation, so they can be retried.
+      try:
+          async with self.getClient().request(
+            "POST",
+            url, 
+            idempotent=True,
+            headers=self.getHeaders(),
+            data=json.dumps({"enable_agent_output": True})
+            ) as response:
+              response.raise_for_status()
+              result = await response.json()
+              logger.debug(f"Successfully received response for {typeOfResult} of operation {operationId}")
+              return result
+      except aiohttp.ClientError as e:
+          logger.error(f"Request error for {typeOfResult} of operation {operationId}: {str(e)}")
+          raise
+      except json.JSONDecodeError as e:
+          logger.error(f"JSON decode error for {typeOfResult} of operation {operationId}: {str(e)}")
+          raise
     
     # PRE: True
     # POST: Returns all operations in the caldera server
     async def __get_new_operations(self):
       url = self.getUrl() + self.getEndpoint()
       logger.debug(f"Requesting all operations from URL: {url}")
-      async with aiohttp.ClientSession() as session:
-        try:
-            async with session.get(
-              url, 
-              headers=self.getHeaders(),
-              data=json.dumps({"enable_agent_output": True})
-              ) as response:
-                response.raise_for_status()
-                result = await response.json()
-                logger.info(f"Successfully retrieved {len(result)} operations")
-                return result
-        except aiohttp.ClientError as e:
-            logger.error(f"Request error getting operations: {str(e)}")
-            raise
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON decode error getting operations: {str(e)}")
-            raise        
+      try:
+          async with self.getClient().request(
+            "GET",
+            url, 
+            headers=self.getHeaders(),
+            data=json.dumps({"enable_agent_output": True})
+            ) as response:
+              response.raise_for_status()
+              result = await response.json()
+              logger.info(f"Successfully retrieved {len(result)} operations")
+              return result
+      except aiohttp.ClientError as e:
+          logger.error(f"Request error getting operations: {str(e)}")
+          raise
+      except json.JSONDecodeError as e:
+          logger.error(f"JSON decode error getting operations: {str(e)}")
+          raise
 
 
     # PRE: True
     # POST: Returns a list of dictionaries with the operation id and name of the operations
     async def get_new_id_operations(self):
-      operations_json = await self.__get_new_operations()
-      recent_operation_ids = []
-      for operation in operations_json:
-        operation_info = {"id": operation['id'], "name": operation['name']}
-        if operation_info not in recent_operation_ids:
-          recent_operation_ids.append(operation_info)
-      return recent_operation_ids
+      index = OperationIndex(await self.__get_new_operations())
+      return [self.__operation_info(operation) for operation in index.operations()]
+
+    # PRE: True
+    # POST: Returns an OperationIndex with all the operations in the caldera server
+    async def get_operation_index(self):
+      return OperationIndex(await self.__get_new_operations())
+
+    # PRE: <state> is an optional string, or list of strings, with the accepted states
+    #      (for example "finished", so running operations are not picked up)
+    #      <start_window> and <finish_window> are optional tuples (from, to) of datetimes
+    #      <name> is an optional string contained in the name of the operation
+    #      <group> is an optional string with the group of the agents of the operation
+    #      <only_new> is True to use the cursor and only return operations that were not
+    #      returned by a previous call
+    # POST: Returns a list of dictionaries with the id and name of the operations that satisfy
+    #       the filters. The /operations listing is requested and indexed once.
+    #       With <only_new>, the cursor is moved forward: the operations before the high-water
+    #       mark are not examined again. Operations rejected only because they are still
+    #       active (ACTIVE_STATES) keep the mark behind them so they are returned once they
+    #       finish. The ones rejected with a final state don't.
+    async def discover_operations(self, state=None, start_window=None, finish_window=None,
+                                  name=None, group=None, only_new=False):
+      logger.info("Discovering operations")
+      try:
+          index = await self.get_operation_index()
+          discovered = []
+          pending_starts = []
+          high_water = self.__cursor_time
+          # The operations to retry that are no longer in Caldera are forgotten
+          self.__retry_ids = {id for id in self.__retry_ids if id in index}
+          for operation in index.operations():
+              start = index.parse_time(operation.get('start'))
+              # The operations already examined also move the mark, so their ids are forgotten
+              if start is not None and (high_water is None or start > high_water):
+                  high_water = start
+              if only_new and not self.__is_after_cursor(operation['id'], start):
+                  continue
+              if not index.matches(operation, None, start_window, finish_window, name, group):
+                  # The operation will never match, so it doesn't stop the cursor
+                  if only_new:
+                      self.__cursor_ids[operation['id']] = start
+                  continue
+              if not index.matches_state(operation, state):
+                  if operation.get('state') in self.ACTIVE_STATES:
+                      # It may match when it finishes, so the cursor waits for it
+                      if start is not None:
+                          pending_starts.append(start)
+                  elif only_new:
+                      # A final state never changes, so it doesn't stop the cursor
+                      self.__cursor_ids[operation['id']] = start
+                  continue
+              if only_new:
+                  self.__cursor_ids[operation['id']] = start
+                  self.__retry_ids.discard(operation['id'])
+              discovered.append(self.__operation_info(operation))
+
+          if only_new:
+              self.__move_cursor(min(pending_starts) if pending_starts else high_water)
+          logger.info(f"Discovered {len(discovered)} operations out of {len(index)}")
+          return discovered
+      except Exception as e:
+          logger.error(f"Error discovering operations: {str(e)}")
+          raise
+
+    # PRE: <operationId> is a string that represents the id of the operation
+    # POST: Removes the operation from the cursor, so the next discovery with <only_new>
+    #       returns it again (for example, because it failed and has to be retried)
+    def forget_operation(self, operationId):
+      self.__cursor_ids.pop(operationId, None)
+      self.__retry_ids.add(operationId)
+
+    # PRE: <operation> is a dictionary with an operation of the Caldera API
+    # POST: Returns a dictionary with the id and the name of the operation
+    def __operation_info(self, operation):
+      return {"id": operation['id'], "name": operation['name']}
+
+    # PRE: <operation_id> is the id of an operation and <start> its start time (or None)
+    # POST: Returns True if the operation has not been examined by a previous discovery
+    def __is_after_cursor(self, operation_id, start):
+      if operation_id in self.__retry_ids:
+          return True
+      if operation_id in self.__cursor_ids:
+          return False
+      return start is None or self.__cursor_time is None or start >= self.__cursor_time
+
+    # PRE: <high_water> is the new high-water mark, or None
+    # POST: Moves the cursor to <high_water> and forgets the ids that are behind it
+    def __move_cursor(self, high_water):
+      self.__cursor_time = high_water
+      if high_water is not None:
+          self.__cursor_ids = {
+              operation_id: start for operation_id, start in self.__cursor_ids.items()
+              if start is None or start >= high_water
+          }
 
     # PRE: <operationId> is a string that represents the id of the operation
     # POST: Deletes the operation with id = <operationId>
     async def delete_operation(self, operationId):
        url = self.getUrl() + self.getEndpoint() + f"/{operationId}"
        logger.debug(f"Deleting operation with ID: {operationId}")
-       async with aiohttp.ClientSession() as session:
-        try:
-            async with session.delete(
-              url, 
-              headers=self.getHeaders()
-            ) as response:
-                response.raise_for_status()
-                logger.info(f"Successfully deleted operation {operationId}")
-                return True
-        except aiohttp.ClientError as e:
-            logger.error(f"Error deleting operation {operationId}: {str(e)}")
-            raise
+       try:
+           async with self.getClient().request(
+             "DELETE",
+             url, 
+             headers=self.getHeaders()
+           ) as response:
+               response.raise_for_status()
+               logger.info(f"Successfully deleted operation {operationId}")
+               return True
+       except aiohttp.ClientError as e:
+           logger.error(f"Error deleting operation {operationId}: {str(e)}")
+           raise
 
     # PRE: True
     # POST: Returns a list of dictionaries with the operation id and name of the operations
     #       that have been seen in the last 24 hours
-    #       The list is in the format [{operation_id: operation_name}, ...]
+    #       The list is in the format [{"id": operation_id, "name": operation_name}, ...]
     async def get_last_24_hours_new_id_operations(self):
       logger.info("Getting new operation IDs from the last 24 hours")
-      try:
-          operations_json = await self.__get_new_operations()
-          recent_operation_ids = []
-          
-          current_time = datetime.utcnow()
-          time_24_hours_ago = current_time - timedelta(hours=24)
-          
-          for operation in operations_json:
-              start_time = operation.get('start')
-              if start_time:
-                  try:
-                      last_seen = datetime.strptime(start_time, "%Y-%m-%dT%H:%M:%SZ")
-                      
-                      if last_seen >= time_24_hours_ago:
-                          operation_info = {"id": operation['id'], "name": operation['name']}
-                          if operation_info not in recent_operation_ids:
-                              recent_operation_ids.append(operation_info)
-                          break
-                  except (ValueError, TypeError) as e:
-                      logger.error(f"Error parsing timestamp for operation {operation.get('id', 'unknown')}: {str(e)}")
-                      continue
-          
-          logger.info(f"Found {len(recent_operation_ids)} recent operations")
-          return recent_operation_ids
-      except Exception as e:
-          logger.error(f"Error getting new operation IDs: {str(e)}")
-          raise
-      
-    
\ No newline at end of file
+      time_24_hours_ago = datetime.utcnow() - timedelta(hours=24)
+      recent_operation_ids = await self.discover_operations(
+          start_window=(time_24_hours_ago, None)
+      )
+      logger.info(f"Found {len(recent_operation_ids)} recent operations")
+      return recent_operation_ids
@@ -0,0 +1,113 @@
+"""
+Author: 	Gari Arellano
+Date:		18-10-2026
+Project: 	Atlassian
+Filename:	OperationIndex.py
+Description:
+  This file contains the OperationIndex class which indexes by id the operations returned by
+  the /operations endpoint of the Caldera API. The listing is parsed once and the operations
+  can then be looked up and filtered by state, start/finish time window, name and group.
+"""
+
+from datetime import datetime
+import logging
+
+logger = logging.getLogger('test_report')
+
+class OperationIndex:
+    TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+    # PRE: <operations_json> is the list of operations returned by the Caldera API
+    # POST: Indexes the operations by id. If an id is repeated, the first operation is kept.
+    def __init__(self, operations_json):
+        self.__operations = {}
+        for operation in operations_json:
+            self.__operations.setdefault(operation['id'], operation)
+
+    def __len__(self):
+        return len(self.__operations)
+
+    def __contains__(self, operation_id):
+        return operation_id in self.__operations
+
+    # PRE: <operation_id> is a string that represents the id of the operation
+    # POST: Returns the operation with id = <operation_id>, or None if it is not indexed
+    def get(self, operation_id):
+        return self.__operations.get(operation_id)
+
+    # PRE: True
+    # POST: Returns the indexed operations in the order of the listing
+    def operations(self):
+        return list(self.__operations.values())
+
+    # PRE: <state> is an optional string, or list of strings, with the accepted states
+    #      <start_window> is an optional tuple (from, to) of datetimes. Any end can be None.
+    #      <finish_window> is an optional tuple (from, to) of datetimes. Any end can be None.
+    #      <name> is an optional string contained in the name of the operation (case
+    #      insensitive)
+    #      <group> is an optional string with the group of the agents of the operation
+    # POST: Returns the operations that satisfy all the given filters, in the order of the
+    #       listing
+    def filter(self, state=None, start_window=None, finish_window=None, name=None, group=None):
+        return [
+            operation for operation in self.__operations.values()
+            if self.matches(operation, state, start_window, finish_window, name, group)
+        ]
+
+    # PRE: <operation> is a dictionary with an operation of the Caldera API
+    #      The rest of parameters are the filters of filter()
+    # POST: Returns True if the operation satisfies all the given filters
+    def matches(self, operation, state=None, start_window=None, finish_window=None, name=None,
+                group=None):
+        if not self.matches_state(operation, state):
+            return False
+        if start_window is not None and not self.__in_window(
+                self.parse_time(operation.get('start')), start_window):
+            return False
+        if finish_window is not None and not self.__in_window(
+                self.parse_time(operation.get('finish')), finish_window):
+            return False
+        if name is not None and name.lower() not in operation.get('name', '').lower():
+            return False
+        if group is not None and group not in self.groups(operation):
+            return False
+        return True
+
+    # PRE: <operation> is a dictionary with an operation of the Caldera API
+    #      <state> is an optional string, or list of strings, with the accepted states
+    # POST: Returns True if there is no state filter or the operation is in one of the states
+    def matches_state(self, operation, state):
+        if state is None:
+            return True
+        states = {state} if isinstance(state, str) else set(state)
+        return operation.get('state') in states
+
+    # PRE: <operation> is a dictionary with an operation of the Caldera API
+    # POST: Returns the set of groups of the operation: the group it was launched against and
+    #       the groups of the agents that took part in it
+    def groups(self, operation):
+        groups = {host.get('group') for host in operation.get('host_group') or []}
+        if operation.get('group'):
+            groups.add(operation['group'])
+        return groups
+
+    # PRE: <value> is a timestamp of the Caldera API or None
+    # POST: Returns the timestamp as a datetime, or None if it is empty or can't be parsed
+    @classmethod
+    def parse_time(cls, value):
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, cls.TIME_FORMAT)
+        except (ValueError, TypeError) as e:
+            logger.error(f"Error parsing timestamp '{value}': {str(e)}")
+            return None
+
+    # PRE: <time> is a datetime or None
+    #      <window> is a tuple (from, to) of datetimes. Any end can be None.
+    # POST: Returns True if <time> is inside the window
+    def __in_window(self, time, window):
+        start, end = window
+        if time is None:
+            return start is None and end is None
+        return (start is None or time >= start) and (end is None or time <= end)
@@ -1,4 +1,5 @@
 from .CalderaApi import CalderaApi
 from .Operation import Operation
+from .OperationIndex import OperationIndex
 
-__all__ = ['CalderaApi', 'Operation']
\ No newline at end of file
+__all__ = ['CalderaApi', 'Operation', 'OperationIndex']
\ No newline at end of file
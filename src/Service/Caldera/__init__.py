@@ -1,5 +1,6 @@
 from .Api.Operation import Operation
 from .Api.Models.OperationModel import OperationModel
 from .Api.Models.AdversaryModel import AdversaryModel
+from .Api.Models.OperationBundleModel import OperationBundleModel
 
-__all__ = ['Operation', 'OperationModel', 'AdversaryModel']
\ No newline at end of file
+__all__ = ['Operation', 'OperationModel', 'AdversaryModel', 'OperationBundleModel']
\ No newline at end of file
@@ -0,0 +1,195 @@
+"""
+Author: 	Gari Arellano
+Date:		18-10-2026
+Project: 	Atlassian
+Filename:	CheckpointStore.py
+Description:
+  This file contains the CheckpointStore class which saves in a local SQLite database the stage
+  reached by each Caldera operation (fetched, extracted, tickets filed, page published and
+  deleted). When a run dies partway through, the next run uses it to skip the stages that were
+  already completed, so the Jira tickets and the Confluence pages are not created twice.
+"""
+
+import datetime
+import json
+import sqlite3
+import threading
+import logging
+
+logger = logging.getLogger('test_report')
+
+class CheckpointStore:
+    # Stages of an operation, in the order they are completed
+    STAGES = ["fetched", "extracted", "tickets_filed", "page_published", "deleted"]
+
+    # PRE: <path> is the path of the SQLite database. It is created if it doesn't exist.
+    # POST: Opens the database and creates the tables if they don't exist.
+    def __init__(self, path="checkpoints.sqlite3"):
+        logger.info(f"Initializing CheckpointStore class with database {path}")
+        self.__path = path
+        # The relevant data is saved from a thread (save_data), so the connection is shared by
+        # the threads and used by one at a time
+        self.__connection = sqlite3.connect(path, check_same_thread=False)
+        self.__lock = threading.RLock()
+        self.__connection.executescript("""
+            CREATE TABLE IF NOT EXISTS operations (
+                operation_id TEXT PRIMARY KEY,
+                name         TEXT,
+                stage        TEXT,
+                title        TEXT,
+                data         TEXT,
+                updated_at   TEXT
+            );
+            CREATE TABLE IF NOT EXISTS tickets (
+                operation_id TEXT,
+                ticket_id    TEXT,
+                issue_key    TEXT,
+                created_at   TEXT,
+                PRIMARY KEY (operation_id, ticket_id)
+            );
+        """)
+        self.__connection.commit()
+        logger.info("CheckpointStore initialized successfully")
+
+    # PRE: True
+    # POST: Closes the database.
+    def close(self):
+        with self.__lock:
+            self.__connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # PRE: <operation_id> is a string that represents the id of the operation
+    # POST: Returns the last stage completed by the operation, or None if it has no checkpoint.
+    def get_stage(self, operation_id):
+        with self.__lock:
+            row = self.__connection.execute(
+                "SELECT stage FROM operations WHERE operation_id = ?", (operation_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    # PRE: <operation_id> is a string that represents the id of the operation
+    #      <stage> is one of the STAGES
+    # POST: Returns True if the operation has already completed <stage>, False otherwise.
+    def is_completed(self, operation_id, stage):
+        current = self.get_stage(operation_id)
+        if current is None:
+            return False
+        return self.STAGES.index(current) >= self.STAGES.index(stage)
+
+    # PRE: <operation_id> is a string that represents the id of the operation
+    #      <stage> is one of the STAGES
+    #      <name> is an optional string with the name of the operation
+    # POST: Saves that the operation has completed <stage>. The stage never goes backwards.
+    #       Once the page is published, the relevant data is not needed anymore and it is
+    #       removed.
+    def mark_stage(self, operation_id, stage, name=None):
+        if stage not in self.STAGES:
+            raise ValueError(f"Unknown checkpoint stage: {stage}")
+        with self.__lock:
+            if self.is_completed(operation_id, stage):
+                return
+            self.__connection.execute(
+                """INSERT INTO operations (operation_id, name, stage, updated_at)
+                   VALUES (?, ?, ?, ?)
+                   ON CONFLICT(operation_id) DO UPDATE SET
+                       name = COALESCE(excluded.name, operations.name),
+                       stage = excluded.stage,
+                       data = CASE WHEN ? THEN NULL ELSE operations.data END,
+                       updated_at = excluded.updated_at""",
+                (operation_id, name, stage, self.__now(),
+                 self.STAGES.index(stage) >= self.STAGES.index("page_published"))
+            )
+            self.__connection.commit()
+        logger.debug(f"Operation {operation_id} checkpointed at stage '{stage}'")
+
+    # PRE: <operation_id> is a string that represents the id of the operation
+    #      <title> is the title of the report of the operation
+    #      <data> is a dictionary with the relevant data of the operation
+    # POST: Saves the title and the relevant data of the operation and marks it as extracted,
+    #       so a rerun can publish it without contacting Caldera again.
+    #       It can be called from a thread: the data of a large operation takes seconds to
+    #       serialize and write.
+    def save_data(self, operation_id, title, data):
+        serialized = json.dumps(data, default=self.__to_json)
+        with self.__lock:
+            self.mark_stage(operation_id, "extracted")
+            self.__connection.execute(
+                "UPDATE operations SET title = ?, data = ?, updated_at = ? "
+                "WHERE operation_id = ?",
+                (title, serialized, self.__now(), operation_id)
+            )
+            self.__connection.commit()
+
+    # PRE: <operation_id> is a string that represents the id of the operation
+    # POST: Returns a tuple (title, data) with the saved relevant data of the operation, or
+    #       (None, None) if it was not saved.
+    def get_data(self, operation_id):
+        with self.__lock:
+            row = self.__connection.execute(
+                "SELECT title, data FROM operations WHERE operation_id = ?", (operation_id,)
+            ).fetchone()
+        if not row or row[1] is None:
+            return None, None
+        return row[0], json.loads(row[1])
+
+    # PRE: <operation_id> is a string that represents the id of the operation
+    #      <ticket_id> is a string that identifies the ticket inside the operation
+    # POST: Returns True if the ticket has already been created in Jira, False otherwise.
+    def is_ticket_filed(self, operation_id, ticket_id):
+        with self.__lock:
+            row = self.__connection.execute(
+                "SELECT 1 FROM tickets WHERE operation_id = ? AND ticket_id = ?",
+                (operation_id, ticket_id)
+            ).fetchone()
+        return row is not None
+
+    # PRE: <operation_id> is a string that represents the id of the operation
+    #      <ticket_id> is a string that identifies the ticket inside the operation
+    #      <issue_key> is the key of the issue created in Jira
+    # POST: Saves that the ticket has been created in Jira.
+    def mark_ticket_filed(self, operation_id, ticket_id, issue_key):
+        with self.__lock:
+            self.__connection.execute(
+                """INSERT OR REPLACE INTO tickets (operation_id, ticket_id, issue_key, created_at)
+                   VALUES (?, ?, ?, ?)""",
+                (operation_id, ticket_id, issue_key, self.__now())
+            )
+            self.__connection.commit()
+
+    # PRE: <max_age> is a number of seconds
+    # POST: Removes the checkpoints (and their tickets) of the operations deleted from Caldera
+    #       more than <max_age> seconds ago and returns the number of removed operations. They
+    #       are never requested again, so only the unfinished operations are kept.
+    def prune(self, max_age):
+        limit = (datetime.datetime.now() - datetime.timedelta(seconds=max_age)).isoformat(
+            timespec="seconds")
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                """DELETE FROM tickets WHERE operation_id IN (
+                       SELECT operation_id FROM operations
+                       WHERE stage = 'deleted' AND updated_at < ?)""",
+                (limit,)
+            )
+            removed = self.__connection.execute(
+                "DELETE FROM operations WHERE stage = 'deleted' AND updated_at < ?", (limit,)
+            ).rowcount
+        if removed:
+            logger.info(f"{removed} checkpoints of deleted operations removed")
+        return removed
+
+    # PRE: <value> is a value that json can't serialize
+    # POST: Returns the dictionary of the records of the report (StepRecord, HostRecord)
+    def __to_json(self, value):
+        if hasattr(value, "to_dict"):
+            return value.to_dict()
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+    # PRE: True
+    # POST: Returns the current date in ISO format.
+    def __now(self):
+        return datetime.datetime.now().isoformat(timespec="seconds")
@@ -0,0 +1,3 @@
+from .CheckpointStore import CheckpointStore
+
+__all__ = ['CheckpointStore']
\ No newline at end of file
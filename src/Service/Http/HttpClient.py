@@ -0,0 +1,223 @@
+"""
+Author: 	Gari Arellano
+Date:		18-10-2026
+Project: 	Atlassian
+Filename:	HttpClient.py
+Description:
+  This file contains the HttpClient class which is the HTTP layer shared by the Caldera, Jira,
+  Confluence and GitLab clients. It owns a pooled aiohttp session and retries the failed
+  requests with exponential backoff and jitter, honoring the Retry-After headers and the rate
+  limit of each service.
+  The requests that create something (POST) are never retried blindly: they are only retried
+  when the server surely didn't process them, or when an idempotency check confirms that
+  nothing was created. Otherwise a DuplicateRequestError is raised with the existing resource.
+"""
+
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from .TokenBucket import TokenBucket
+import aiohttp
+import asyncio
+import os
+import random
+import logging
+
+logger = logging.getLogger('test_report')
+
+class DuplicateRequestError(Exception):
+    # PRE: <existing> is the resource that was already created by a previous attempt
+    def __init__(self, message, existing):
+        super().__init__(message)
+        self.existing = existing
+
+class HttpClient:
+    # Statuses that are worth retrying
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    # Methods that can be repeated without side effects
+    IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+    # PRE: <service> is the name of the service (caldera, jira, confluence, gitlab). It is used
+    #      to share the rate limit and to read its configuration: <service>_rate_limit (requests
+    #      per second) and <service>_rate_burst
+    #      <ssl> is the ssl parameter of the aiohttp connector (False to ignore the certificate)
+    #      <limit>, <limit_per_host> and <keepalive_timeout> configure the pool of connections
+    #      <max_retries> is the maximum number of retries of a request
+    #      <backoff_base> and <backoff_max> are the base and the maximum seconds of the backoff
+    def __init__(self, service, ssl=None, limit=100, limit_per_host=10, keepalive_timeout=30,
+                 max_retries=None, backoff_base=0.5, backoff_max=30):
+        self.__service = service
+        self.__ssl = ssl
+        self.__limit = limit
+        self.__limit_per_host = limit_per_host
+        self.__keepalive_timeout = keepalive_timeout
+        self.__max_retries = max_retries if max_retries is not None \
+            else int(os.getenv("http_max_retries", "5"))
+        self.__backoff_base = backoff_base
+        self.__backoff_max = backoff_max
+        rate = os.getenv(f"{service}_rate_limit")
+        burst = os.getenv(f"{service}_rate_burst")
+        self.__bucket = TokenBucket.for_service(
+            service,
+            float(rate) if rate else None,
+            float(burst) if burst else None
+        )
+        self.__session = None
+
+    def getService(self):
+        return self.__service
+
+    # PRE: True
+    # POST: Returns the shared session of the client. If the session is not open yet (or it
+    #       was closed), a new one is created.
+    def getSession(self):
+        if self.__session is None or self.__session.closed:
+            logger.debug(
+                f"Opening {self.__service} session (limit: {self.__limit}, "
+                f"limit per host: {self.__limit_per_host})"
+            )
+            connector = aiohttp.TCPConnector(
+                limit=self.__limit,
+                limit_per_host=self.__limit_per_host,
+                keepalive_timeout=self.__keepalive_timeout,
+                ssl=self.__ssl
+            )
+            self.__session = aiohttp.ClientSession(connector=connector)
+        return self.__session
+
+    # PRE: True
+    # POST: Opens the shared session of the client.
+    async def open(self):
+        self.getSession()
+        return self
+
+    # PRE: True
+    # POST: Closes the shared session of the client and all its pooled connections.
+    async def close(self):
+        if self.__session is not None and not self.__session.closed:
+            await self.__session.close()
+            logger.debug(f"{self.__service} session closed")
+        self.__session = None
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    # PRE: <method> and <url> are the method and the url of the request
+    #      <idempotent> is True if the request can be repeated without side effects. By default
+    #      it depends on the method (POST is not idempotent).
+    #      <idempotency_check> is an optional coroutine function for non idempotent requests.
+    #      It is called when it is unknown if a failed attempt was processed by the server, and
+    #      it returns the resource created by that attempt, or None if nothing was created.
+    #      <data_factory> is an optional function without parameters that returns the body of
+    #      the request. It is called once per attempt, so a body that can only be read once
+    #      (an async generator) is rebuilt when the request is retried. It replaces <data>.
+    #      <kwargs> are the parameters of aiohttp (headers, data, auth, params...)
+    # POST: Yields the response of the request, retrying it when it fails with a retryable
+    #       status or a network error. The last response is yielded even if it is an error, so
+    #       the caller checks the status as usual.
+    #       Raises DuplicateRequestError if the idempotency check finds the resource.
+    @asynccontextmanager
+    async def request(self, method, url, idempotent=None, idempotency_check=None,
+                      data_factory=None, **kwargs):
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in self.IDEMPOTENT_METHODS
+        attempt = 0
+        while True:
+            await self.__bucket.acquire()
+            if data_factory is not None:
+                kwargs["data"] = data_factory()
+            try:
+                response = await self.getSession().request(method, url, **kwargs)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                # A connection that was never established can't have been processed
+                processed = not isinstance(e, aiohttp.ClientConnectorError)
+                if attempt >= self.__max_retries:
+                    raise
+                if processed and not idempotent:
+                    await self.__check_not_created(method, url, idempotency_check, str(e))
+                delay = self.__backoff(attempt)
+                logger.warning(
+                    f"{self.__service} {method} {url} failed: {str(e)}. "
+                    f"Retrying in {delay:.1f}s ({attempt + 1}/{self.__max_retries})"
+                )
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+
+            if response.status not in self.RETRY_STATUSES or attempt >= self.__max_retries:
+                try:
+                    yield response
+                finally:
+                    response.release()
+                return
+
+            retry_after = self.__retry_after(response)
+            response.release()
+            # 429 means the request was rejected without processing it. Any other error of a
+            # non idempotent request may have created the resource.
+            if response.status != 429 and not idempotent:
+                await self.__check_not_created(method, url, idempotency_check,
+                                               f"status {response.status}")
+            if retry_after is not None:
+                # The whole service is paused, not only this request
+                self.__bucket.block_for(retry_after)
+                delay = retry_after
+            else:
+                delay = self.__backoff(attempt)
+            logger.warning(
+                f"{self.__service} {method} {url} answered {response.status}. "
+                f"Retrying in {delay:.1f}s ({attempt + 1}/{self.__max_retries})"
+            )
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    # PRE: <method> and <url> identify the failed request and <reason> describes the failure
+    #      <idempotency_check> is the idempotency check of the request, or None
+    # POST: Returns if it is safe to repeat the request because nothing was created.
+    #       Raises DuplicateRequestError if the resource was created, or an exception if it
+    #       can't be known (there is no check or the check fails).
+    async def __check_not_created(self, method, url, idempotency_check, reason):
+        if idempotency_check is None:
+            raise Exception(
+                f"{self.__service} {method} {url} failed ({reason}) and it is not retried "
+                f"because it may have been processed"
+            )
+        try:
+            existing = await idempotency_check()
+        except Exception as e:
+            raise Exception(
+                f"{self.__service} {method} {url} failed ({reason}) and the idempotency check "
+                f"failed too: {str(e)}"
+            )
+        if existing is not None:
+            raise DuplicateRequestError(
+                f"{self.__service} {method} {url} was already processed", existing
+            )
+        logger.info(f"{self.__service} {method} {url} was not processed, it is safe to retry")
+
+    # PRE: <attempt> is the number of the failed attempt, starting at 0
+    # POST: Returns the seconds to wait: exponential backoff with full jitter
+    def __backoff(self, attempt):
+        return random.uniform(0, min(self.__backoff_max, self.__backoff_base * 2 ** attempt))
+
+    # PRE: <response> is an aiohttp response
+    # POST: Returns the seconds of the Retry-After header (in seconds or as a date), or None if
+    #       the header is not present or can't be parsed
+    def __retry_after(self, response):
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            retry_date = parsedate_to_datetime(value)
+            return max(0.0, (retry_date - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            logger.warning(f"Invalid Retry-After header: {value}")
+            return None
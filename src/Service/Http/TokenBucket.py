@@ -0,0 +1,68 @@
+"""
+Author: 	Gari Arellano
+Date:		18-10-2026
+Project: 	Atlassian
+Filename:	TokenBucket.py
+Description:
+  This file contains the TokenBucket class which limits the rate of the requests made to a
+  service. There is one bucket per service (Caldera, Jira, Confluence, GitLab) shared by all
+  the clients of that service, and it can be blocked for a while when the service answers
+  with a Retry-After header.
+"""
+
+import asyncio
+import time
+import logging
+
+logger = logging.getLogger('test_report')
+
+class TokenBucket:
+    # Buckets shared by all the clients of the same service
+    __buckets = {}
+
+    # PRE: <service> is the name of the service
+    #      <rate> is the number of requests per second, or None for no limit
+    #      <burst> is the maximum number of requests that can be made at once
+    # POST: Returns the bucket of <service>. It is created with <rate> and <burst> the first
+    #       time the service is requested.
+    @classmethod
+    def for_service(cls, service, rate=None, burst=None):
+        if service not in cls.__buckets:
+            cls.__buckets[service] = cls(rate, burst)
+            if rate is not None:
+                logger.info(f"Rate limit for {service}: {rate} requests/s (burst {burst})")
+        return cls.__buckets[service]
+
+    # PRE: <rate> is the number of requests per second, or None for no limit
+    #      <burst> is the maximum number of requests that can be made at once
+    def __init__(self, rate=None, burst=None):
+        self.__rate = rate
+        self.__burst = burst if burst is not None else max(1, rate or 1)
+        self.__tokens = self.__burst
+        self.__updated = time.monotonic()
+        self.__blocked_until = 0
+
+    # PRE: True
+    # POST: Waits until a request can be made and takes a token of the bucket.
+    #       The tokens are reserved before waiting, so the waiting requests are served in
+    #       order without a lock (there is no await between reading and updating the bucket).
+    async def acquire(self):
+        while True:
+            wait = self.__blocked_until - time.monotonic()
+            if wait <= 0:
+                break
+            await asyncio.sleep(wait)
+
+        if self.__rate is None:
+            return
+        now = time.monotonic()
+        self.__tokens = min(self.__burst, self.__tokens + (now - self.__updated) * self.__rate)
+        self.__updated = now
+        self.__tokens -= 1
+        if self.__tokens < 0:
+            await asyncio.sleep(-self.__tokens / self.__rate)
+
+    # PRE: <seconds> is the number of seconds the service asked to wait
+    # POST: No request of the service is made during the next <seconds> seconds
+    def block_for(self, seconds):
+        self.__blocked_until = max(self.__blocked_until, time.monotonic() + seconds)
@@ -0,0 +1,4 @@
+from .TokenBucket import TokenBucket
+from .HttpClient import HttpClient, DuplicateRequestError
+
+__all__ = ['TokenBucket', 'HttpClient', 'DuplicateRequestError']
\ No newline at end of file
@@ -8,26 +8,43 @@ Description:
   space.
 """
 from requests.auth import HTTPBasicAuth
+from ..Http import HttpClient, DuplicateRequestError
 import json
+import uuid
 import aiohttp
 import logging
 
 logger = logging.getLogger('test_report')
 
 class CreatePage:
+    # Bytes of HTML sent in each chunk of a streamed page
+    UPLOAD_CHUNK_SIZE = 64 * 1024
+
     def __init__(self, url, email, token):
        logger.info("Initializing CreatePage class")
        self.url = url
        # It has to be the Aiohttp BasicAuth object because aiohttp need this kind of
        # object to make the authentication
        self.auth = aiohttp.BasicAuth(email, token) 
+       # Ignore the SSL certificate
+       self.__client = HttpClient("confluence", ssl=False)
        logger.info("CreatePage initialized successfully")
 
+    # PRE: True
+    # POST: Closes the connections to Confluence.
+    async def close(self):
+      await self.__client.close()
+
     # PRE: <space_id> is a string that represents the space id
     #      <title> is a string that represents the title of the page
     #      <parent_id> is a string that represents the parent id of the page
-    #      <body> is a string that represents the body of the page. This is the HTML content
-    # POST: Returns a JSON object with the response of the created page on Confluence server
+    #      <body> is a string that represents the body of the page. This is the HTML content.
+    #      It can also be a function that returns an iterator with the chunks of the HTML
+    #      (CreateReport.create_report_stream): then the page is sent in chunks as it is
+    #      rendered, without the whole HTML nor its JSON in memory.
+    # POST: Returns a JSON object with the response of the created page on Confluence server,
+    #       or the page that already had <title> if Confluence rejects it as a duplicate.
+    #       Raises an exception if the page could not be created.
     async def create(self, space_id, title, parent_id, body):
       logger.info(f"Creating new page with title: {title}")
       logger.debug(f"Space ID: {space_id}, Parent ID: {parent_id}")
@@ -36,7 +53,52 @@ class CreatePage:
         "Accept": "application/json",
         "Content-Type": "application/json"
       }
-      payload = json.dumps({
+      if callable(body):
+          # The chunks are consumed by the upload, so the body is rendered again on each retry
+          request_body = {"data_factory": lambda: self.__stream_payload(space_id, title, 
+                                                                         parent_id, body)}
+      else:
+          request_body = {"data": self.__payload(space_id, title, parent_id, body)}
+      try:
+          # The request is retried only if the page was not created by the failed attempt
+          async with self.__client.request(
+             "POST",
+             self.url,
+             idempotency_check=lambda: self.find(space_id, title),
+             headers=headers,
+             auth=self.auth,
+             **request_body
+          ) as response:
+              if response.status in [200, 201]:
+                  logger.info(f"Page '{title}' created successfully")
+                  return await response.json()
+              else:
+                  error_text = await response.text()
+                  if 400 <= response.status < 500:
+                      # Confluence rejects a title that already exists (a page created by a
+                      # run that died before checkpointing it), and it is not retried
+                      existing = await self.find(space_id, title)
+                      if existing is not None:
+                          logger.warning(f"Page '{title}' already exists, it is not created again")
+                          return existing
+                  logger.error(
+                      f"Failed to create page '{title}'. "
+                      f"Status: {response.status}. "
+                      f"Error: {error_text}."
+                  )
+                  # Raise so the page is not considered published (and checkpointed)
+                  raise Exception(f"Failed to create page '{title}': {error_text}")
+      except DuplicateRequestError as e:
+          logger.warning(f"Page '{title}' was already created by a previous attempt")
+          return e.existing
+      except Exception as e:
+          logger.error(f"Error creating page '{title}': {str(e)}")
+          raise
+
+    # PRE: <space_id>, <title>, <parent_id> and <body> are the same as in create
+    # POST: Returns the JSON payload of the page
+    def __payload(self, space_id, title, parent_id, body):
+      return json.dumps({
         "spaceId": space_id,
         "status": "current",
         "title": title,
@@ -45,31 +107,82 @@ class CreatePage:
            "representation": "storage",
            "value": body
         }
-      }) 
-      # With connector=aiohttp.TCPConnector(ssl=False) we are ignoring the SSL certificate
-      try:
-          async with aiohttp.ClientSession(
-              connector=aiohttp.TCPConnector(ssl=False) # Ignore the SSL certificate
-          ) as session:
-              # Use aiohttp to make an asynchronous request
-              async with session.post(
-                 self.url,
-                 headers=headers,
-                 auth=self.auth,
-                 data=payload
-              ) as response:
-                  if response.status == 200:
-                      logger.info(f"Page '{title}' created successfully")
-                      return await response.json()
-                  else:
-                      error_text = await response.text()
-                      logger.error(
-                          f"Failed to create page '{title}'. "
-                          f"Status: {response.status}. "
-                          f"Error: {error_text}."
-                      )
-                      return error_text
-      except Exception as e:
-          logger.error(f"Error creating page '{title}': {str(e)}")
-          raise
+      })
+
+    # PRE: <space_id>, <title> and <parent_id> are the same as in create
+    #      <chunks> is a function that returns an iterator with the chunks of the HTML
+    # POST: Yields the JSON payload of the page in bytes, with the same content as __payload.
+    #       The chunks of the HTML are escaped one by one (the JSON escape of a string is the
+    #       escape of each character) and sent in blocks of UPLOAD_CHUNK_SIZE.
+    async def __stream_payload(self, space_id, title, parent_id, chunks):
+      # The value of the body is the last field, so the payload is split where it goes
+      prefix, suffix = self.__payload(space_id, title, parent_id, "").rsplit('""', 1)
+      buffer = [prefix, '"']
+      size = 0
+      for chunk in chunks():
+          escaped = json.dumps(chunk)[1:-1]
+          buffer.append(escaped)
+          size += len(escaped)
+          if size >= self.UPLOAD_CHUNK_SIZE:
+              yield "".join(buffer).encode()
+              buffer = []
+              size = 0
+      buffer.extend(['"', suffix])
+      yield "".join(buffer).encode()
+
+    # PRE: <page_id> is the id of a page created by create
+    #      <filename> is the name of the attachment
+    #      <content> is the content of the attachment in bytes
+    # POST: Uploads the attachment to the page. The API v2 doesn't upload attachments, so the
+    #       API v1 of the same site is used. It is sent with PUT, which creates the attachment
+    #       or updates the one with the same name (a POST is rejected if the name exists), so
+    #       the request can be retried.
+    #       Raises an exception if the attachment could not be uploaded.
+    async def attach(self, page_id, filename, content):
+      logger.debug(f"Uploading attachment {filename} to page {page_id}")
+      site = self.url.split("/wiki/")[0]
+      # The multipart body is built once in bytes, so every retry sends the same body
+      boundary = uuid.uuid4().hex
+      body = (
+        f'--{boundary}\r\n'
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f'Content-Type: text/plain\r\n\r\n'
+      ).encode() + content + f'\r\n--{boundary}--\r\n'.encode()
+      headers = {
+        "Accept": "application/json",
+        "Content-Type": f"multipart/form-data; boundary={boundary}",
+        "X-Atlassian-Token": "no-check"
+      }
+      async with self.__client.request(
+         "PUT",
+         f"{site}/wiki/rest/api/content/{page_id}/child/attachment",
+         idempotent=True,
+         headers=headers,
+         auth=self.auth,
+         data=body
+      ) as response:
+          if response.status not in [200, 201]:
+              error_text = await response.text()
+              raise Exception(f"Failed to upload attachment {filename}: {error_text}")
+          logger.info(f"Attachment {filename} uploaded to page {page_id}")
+
+    # PRE: <space_id> is a string that represents the space id
+    #      <title> is a string that represents the title of the page
+    # POST: Returns a JSON object with the page of the space with the given title, or None if
+    #       there is no such page
+    async def find(self, space_id, title):
+      logger.debug(f"Searching page '{title}' in space {space_id}")
+      async with self.__client.request(
+         "GET",
+         self.url,
+         headers={"Accept": "application/json"},
+         auth=self.auth,
+         params={"space-id": space_id, "title": title}
+      ) as response:
+          response.raise_for_status()
+          result = await response.json()
+          for page in result.get("results", []):
+              if page.get("title") == title:
+                  return page
+          return None
           
\ No newline at end of file
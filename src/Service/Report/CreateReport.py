@@ -9,24 +9,52 @@ Description:
 """
 from .GenerateHtml import GenerateHtml
 from .WhiteList import WhiteList
+from .Models import StepRecord, HostRecord
+import asyncio
 import logging
 
 logger = logging.getLogger('test_report')
 
 class CreateReport:
+    # Output of the steps without an entry in the event logs
+    NO_OUTPUT = ("No output available", None, None)
+
+    # Number of entries of the event logs indexed at a time by setEventLogStream
+    INDEX_BATCH = 1000
 
     # PRE: <report> is an optional dictionary that represents the report.
     #      <event_logs> is an optional list of dictionaries that represents the event logs.
+    #      <output_store> is an optional OutputStore object. With it, the outputs bigger than its
+    #      preview are spilled to the store and the steps only keep a preview and a reference.
+    #      <charts> is an optional ChartRenderer object that renders the charts of
+    #      create_report_stream out of the event loop.
     # POST: Initializes the report and event_logs attributes with the given values (or empty values 
     #       if not provided) and creates a new instance of the WhiteList class.
-    def __init__(self, report=None, event_logs=None):
+    def __init__(self, report=None, event_logs=None, output_store=None, charts=None):
         logger.info("Initializing CreateReport class")
         self.report = report if report is not None else ""
         # The event_logs is necessary to extract the output of the steps
         self.event_logs = event_logs if event_logs is not None else ""
+        self.__output_store = output_store
+        # Index pid -> output of the event logs, so each step finds its output in O(1)
+        self.__outputs = self.__index_event_logs(self.event_logs)
         self.whitelist = WhiteList()
-        self.__html = GenerateHtml()
+        self.__html = GenerateHtml(charts=charts)
         logger.info("CreateReport initialized successfully")
+
+    # PRE: <cache> is a PayloadCache object
+    #      <operation_id> is the id of an operation saved in the cache
+    #      <output_store> and <charts> are optional OutputStore and ChartRenderer objects (see
+    #      __init__)
+    # POST: Returns a new CreateReport with the report and the event logs saved in the cache,
+    #       so the report can be rendered again without contacting Caldera.
+    #       Raises KeyError if the operation is not in the cache.
+    @classmethod
+    def from_cache(cls, cache, operation_id, output_store=None, charts=None):
+        inform, event_logs = cache.get_bundle(operation_id)
+        if inform is None:
+            raise KeyError(f"Operation {operation_id} is not in the payload cache")
+        return cls(inform, event_logs, output_store, charts)
     
 
     # PRE: <report> is a dictionary that represents the report.
@@ -41,105 +69,175 @@ class CreateReport:
     def setEventLogs(self, event_logs):
         logger.info("Setting new event logs")
         self.event_logs = event_logs
+        self.__outputs = self.__index_event_logs(event_logs)
+        logger.info("Event logs updated successfully")
+
+    # PRE: <entries> is an async iterator with the entries of the event logs (for example
+    #      Operation.iter_event_logs)
+    # POST: Indexes the entries as they arrive, without keeping them: only the index pid ->
+    #       output is kept (with the previews of the big outputs, if there is an OutputStore).
+    #       The entries are indexed in batches in a thread, so the compression of the big
+    #       outputs doesn't stop the event loop.
+    async def setEventLogStream(self, entries):
+        logger.info("Indexing the event logs as they arrive")
+        loop = asyncio.get_running_loop()
+        outputs = {}
+        spilled = 0
+        batch = []
+        async for entry in entries:
+            batch.append(entry)
+            if len(batch) >= self.INDEX_BATCH:
+                spilled += await loop.run_in_executor(None, self.__add_event_logs, outputs, batch)
+                batch = []
+        if batch:
+            spilled += await loop.run_in_executor(None, self.__add_event_logs, outputs, batch)
+        self.__log_spilled(spilled)
+        self.event_logs = []
+        self.__outputs = outputs
         logger.info("Event logs updated successfully")
 
-    # PRE: <white_list> is a WhiteList object to check if the ability is in the whitelist.
+    # PRE: <white_list> is a WhiteList (or WhiteListSnapshot) object to check if the ability
+    #      is in the whitelist.
     # POST: Returns a new dictionary with the relevant data extracted from the JSON report.
+    #       The whole extraction uses the same snapshot of the whitelist, even if it is
+    #       refreshed meanwhile, and its version is saved in the data.
     def extract_relevant_data(self, white_list):
         logger.info("Extracting relevant data from report")
         try:
-            result = self.__extract_relevant_data(white_list)
+            white_list = white_list.snapshot()
+            result = self.extract_header(white_list)
+            result["steps"] = list(self.iter_steps(white_list))
             logger.info("Data extraction completed successfully")
             return result
         except Exception as e:
             logger.error(f"Error extracting relevant data: {str(e)}")
             raise
-        
-    # PRE: <data> is a dictionary that contains the report data.
-    # POST: Returns an HTML string that represents the report.
-    def create_report(self, data):
-        #html_report = GenerateHtml(data)
-        self.__html.setData(data)
-        return self.__html.create_html()
 
-    # PRE: <white_list> is a WhiteList object to check if the ability is in the whitelist.
-    # POST: Returns a new dictionary with the relevant data extracted from the JSON report. 
-    def __extract_relevant_data(self, white_list):
+    # PRE: <white_list> is a WhiteList (or WhiteListSnapshot) object.
+    # POST: Returns a dictionary with the relevant data of the report without the steps: the
+    #       name, the groups, the hosts (HostRecord objects) and the version of the whitelist.
+    def extract_header(self, white_list):
         hosts = []
-        #techniques = {}
-        steps = []
         # List to store all groups
         group = []
-        # Dictionary to map PAW to host
-        paw_hosts = {}
-        # Dictionary to map PAW to group
-        paw_group = {}
-        # Dictionary to map PAW to IP
-        ip_hosts = {}
         
         # First we extract the relevant data for the hosts
         for host in self.report["host_group"]:
-            paw_hosts[host["paw"]] = host["host"]
-            paw_group[host["paw"]] = host["group"]
-            ip_hosts[host["paw"]] = host["host_ip_addrs"][0] if host["host_ip_addrs"] else "Unknown"
-            
             # Add group if not already present
             if host["group"] not in group:
                 group.append(host["group"])
                 
             # Add host information
-            hosts.append({
-                "paw": host["paw"],
-                "host": host["host"],
-                "group": host["group"],
-                "platform": host["platform"],
-                "ip": host["host_ip_addrs"][0] if host["host_ip_addrs"] else "Unknown",
-                "privilege": host["privilege"],
-            })
-            
-        # Next extract steps information
-        for agent_paw, step_list in self.report.get("steps", {}).items():
-            for step in step_list.get("steps", []):
-                steps.append({
-                    "host": paw_hosts.get(agent_paw, "Unknown"),
-                    "ip": ip_hosts.get(agent_paw, "Unknown"),
-                    "group": paw_group.get(agent_paw, "Unknown"),
-                    "name": step["name"],
-                    "technique_id": step["attack"]["technique_id"],
-                    "command": step["command"],
-                    "plaintext_command": step["plaintext_command"],
-                    "platform": step["platform"],
-                    "description": step["description"],
-                    # Extract the output from the event-logs file
-                    "output": self.__extract_output(step["pid"]),
-                    "status": self.__set_status(step["ability_id"], 
-                                              paw_group.get(agent_paw, "Unknown"), 
-                                              step["status"],
-                                              white_list),
-                    "ability_id": step["ability_id"],
-                })
-
+            hosts.append(HostRecord(
+                paw=host["paw"],
+                host=host["host"],
+                group=host["group"],
+                platform=host["platform"],
+                ip=host["host_ip_addrs"][0] if host["host_ip_addrs"] else "Unknown",
+                privilege=host["privilege"],
+            ))
 
         return {
             "name": self.report["name"],
             "group": group,
             "hosts": hosts,
-            "steps": steps
+            "whitelist_version": white_list.snapshot().version
         }
 
+    # PRE: <white_list> is a WhiteList (or WhiteListSnapshot) object.
+    # POST: Yields a StepRecord for each step of the report, in the order of the report, as
+    #       they are extracted.
+    def iter_steps(self, white_list):
+        white_list = white_list.snapshot()
+        for step_list, host, ip, group in self.__agents():
+            for step in step_list:
+                yield self.extract_step(step, host, ip, group, self.__outputs, white_list)
+        stats = white_list.get_stats()
+        logger.info(f"Whitelist decisions: {stats['decision_hits']} hits, "
+                    f"{stats['decision_misses']} misses")
+        
+    # PRE: <data> is a dictionary that contains the report data.
+    #      <step_rows> and <stats> are the optional HTML rows and statistics of the steps,
+    #      when the steps were consumed by the streaming pipeline (see GenerateHtml).
+    # POST: Returns an HTML string that represents the report.
+    def create_report(self, data, step_rows=None, stats=None):
+        #html_report = GenerateHtml(data)
+        self.__html.setData(data)
+        return self.__html.create_html(step_rows, stats)
+
+    # PRE: The same as create_report.
+    # POST: Returns a function that returns an iterator with the chunks of the HTML of the
+    #       report (see GenerateHtml.create_html_stream), so it can be uploaded without
+    #       rendering it whole in memory.
+    async def create_report_stream(self, data, step_rows=None, stats=None):
+        self.__html.setData(data)
+        return await self.__html.create_html_stream(step_rows, stats)
+
+    # PRE: True
+    # POST: Returns a list with a tuple for each agent (paw) of the report: the
+    #       list of steps of the agent and its host, IP and group.
+    def __agents(self):
+        # Dictionary to map PAW to host
+        paw_hosts = {}
+        # Dictionary to map PAW to group
+        paw_group = {}
+        # Dictionary to map PAW to IP
+        ip_hosts = {}
+        for host in self.report["host_group"]:
+            paw_hosts[host["paw"]] = host["host"]
+            paw_group[host["paw"]] = host["group"]
+            ip_hosts[host["paw"]] = host["host_ip_addrs"][0] if host["host_ip_addrs"] else "Unknown"
+
+        return [
+            (step_list.get("steps", []), paw_hosts.get(agent_paw, "Unknown"),
+             ip_hosts.get(agent_paw, "Unknown"), paw_group.get(agent_paw, "Unknown"))
+            for agent_paw, step_list in self.report.get("steps", {}).items()
+        ]
+
+    # PRE: <step> is a step of the Caldera report.
+    #      <host>, <ip> and <group> are the host, the IP and the group of its agent.
+    #      <outputs> is the index pid -> output of the event logs.
+    #      <white_list> is a WhiteListSnapshot object to check if the ability is in the whitelist.
+    # POST: Returns the StepRecord of the step.
+    @staticmethod
+    def extract_step(step, host, ip, group, outputs, white_list):
+        # Use the PID of the step to find the output in the event logs.
+        output, output_ref, output_size = outputs.get(step["pid"], CreateReport.NO_OUTPUT)
+        # The whitelist is checked once per step and the decision is kept in the record
+        whitelisted = white_list.is_in_whitelist(step["ability_id"], group)
+        return StepRecord(
+            host=host,
+            ip=ip,
+            group=group,
+            name=step["name"],
+            technique_id=step["attack"]["technique_id"],
+            command=step["command"],
+            plaintext_command=step["plaintext_command"],
+            platform=step["platform"],
+            description=step["description"],
+            output=output,
+            status=CreateReport.__set_status(step["ability_id"], group, step["status"],
+                                             whitelisted),
+            ability_id=step["ability_id"],
+            output_ref=output_ref,
+            output_size=output_size,
+            whitelisted=whitelisted,
+        )
+
     # PRE: <group> is a string that represents the group of the host.
     #      <last_seen> is a string that represents the last seen date of the host.
     #      <status> is an integer that represents the status of the step.
-    #      <white_list> is a WhiteList object to check if the ability is in the whitelist.
+    #      <whitelisted> is True if the ability is in the whitelist of the group.
     # POST: Returns a string that represents the status of the step.
     #       If the ability is in the WhiteList of the client, it returns "Ommitted".
     #       Else
     #       If the status is 0, it returns "Success". 
     #       If the status is 1, it returns "Failed".
-    def __set_status(self, ability_id, group, status, white_list):
+    @staticmethod
+    def __set_status(ability_id, group, status, whitelisted):
         logger.info("Setting status of the step")
         # Check if the ability is in the whitelist
-        if white_list.is_in_whitelist(ability_id, group):
+        if whitelisted:
             logger.info(f"Ability {ability_id} is in whitelist for group {group}")
             return "Omitted"
         else:
@@ -153,13 +251,37 @@ class CreateReport:
                 return "Unknown"
         
 
-    # PRE: <pid> is the process ID of the step.
-    # POST: Returns the output of the step with the given process ID.
-    def __extract_output(self, pid):
-        for entry in self.event_logs:
-            # Use the PID of the step to find the output in the event logs.
-            if entry["pid"] == pid:
-                return entry.get("output", {}).get("stdout", "")
-        return "No output available"
-    
-    
\ No newline at end of file
+    # PRE: <event_logs> is a list of dictionaries that represents the event logs.
+    # POST: Returns a dictionary that maps the PID of each entry to a tuple (output, reference,
+    #       size). Without an OutputStore the output is the stdout and the reference and the size
+    #       are None. With it, the big outputs are spilled here, once per event, so the steps
+    #       only receive the previews.
+    #       If a PID appears more than once, the first entry is kept (as the linear search did).
+    def __index_event_logs(self, event_logs):
+        outputs = {}
+        self.__log_spilled(self.__add_event_logs(outputs, event_logs))
+        return outputs
+
+    # PRE: <outputs> is an index pid -> (output, reference, size)
+    #      <event_logs> is an iterable with entries of the event logs
+    # POST: Adds the entries whose PID is not in <outputs> yet (see __index_event_logs) and
+    #       returns the number of outputs spilled to the output store.
+    def __add_event_logs(self, outputs, event_logs):
+        spilled = 0
+        for entry in event_logs:
+            pid = entry["pid"]
+            if pid not in outputs:
+                stdout = (entry.get("output") or {}).get("stdout", "")
+                if self.__output_store is None:
+                    outputs[pid] = (stdout, None, None)
+                else:
+                    outputs[pid] = self.__output_store.spill(stdout)
+                    spilled += outputs[pid][1] is not None
+        return spilled
+
+    # PRE: <spilled> is the number of outputs spilled to the output store
+    # POST: Logs the number of spilled outputs, if any
+    def __log_spilled(self, spilled):
+        if spilled:
+            logger.info(f"{spilled} outputs bigger than {self.__output_store.getPreviewBytes()} "
+                        f"bytes spilled to the output store")
@@ -7,14 +7,44 @@ Description:
     This file contains the GenerateHtml class which is used to generate an HTML report from the
     Caldera JSON report data.
 """
-from jinja2 import Template
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache
+from dotenv import load_dotenv
+import os
 from ..Statistics import Statistics
+from ..Cache import OutputStore
+
+# The templates are compiled once per process by this environment, not on every report. With
+# jinja_bytecode_cache_dir, the compiled templates are also saved on disk, so a new process
+# (cron, container) doesn't compile them again.
+load_dotenv()
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Templates")
+BYTECODE_CACHE_DIR = os.getenv("jinja_bytecode_cache_dir", "")
+if BYTECODE_CACHE_DIR:
+    os.makedirs(BYTECODE_CACHE_DIR, exist_ok=True)
+ENVIRONMENT = Environment(
+    loader=FileSystemLoader(TEMPLATE_DIR),
+    bytecode_cache=FileSystemBytecodeCache(BYTECODE_CACHE_DIR) if BYTECODE_CACHE_DIR else None,
+    # The templates are not reloaded when the files change
+    auto_reload=False
+)
+# The rows link the full outputs with the name they are attached with to the page
+ENVIRONMENT.globals["attachment_name"] = OutputStore.attachment_name
+
+# Row of the table of executed steps. The rows are rendered one by one, so the streaming
+# pipeline can render each step as soon as it is extracted and release it.
+STEP_ROW_TEMPLATE = ENVIRONMENT.get_template("step_row.html")
+# Page of the report, with the rows already rendered
+REPORT_TEMPLATE = ENVIRONMENT.get_template("report.html")
 
 class GenerateHtml:
     
-    def __init__(self, report_data=None):
+    # PRE: <report_data> is an optional dictionary that contains the JSON report data.
+    #      <charts> is an optional ChartRenderer object that renders the charts of
+    #      create_html_stream out of the event loop.
+    def __init__(self, report_data=None, charts=None):
         self.report_data = report_data if report_data is not None else ""
         self.__stats = Statistics()
+        self.__charts = charts
 
     # PRE: <report_data> is a dictionary that contains the JSON report data.
     # POST: Sets the report_data attribute to the given value.
@@ -22,137 +52,61 @@ class GenerateHtml:
         self.report_data = report_data
         
 
+    # PRE: <step> is a step of the relevant data (StepRecord or dictionary).
+    # POST: Returns the HTML row of the step in the table of executed steps.
+    @staticmethod
+    def render_step_row(step):
+        return STEP_ROW_TEMPLATE.render(step=step)
+
     # PRE: <report_data> is a dictionary that contains the JSON report data.
+    #      <step_rows> is an optional iterable with the HTML rows of the steps, already rendered
+    #      by render_step_row (a list, or a RowSpool that is read again on every iteration).
+    #      By default they are rendered from the steps of <report_data>.
+    #      <stats> is an optional dictionary with the statistics of the steps. By default
+    #      they are calculated from the steps of <report_data>.
     # POST: Returns an HTML string that represents the report.
     # OBS: The HTML has inline CSS because it is going to be used in Confluence. 
     #      With style tags Confluence doesn't render the CSS.
-    def create_html(self):
-        ##statistics = Statistics(self.report_data)
-        self.__stats.setData(self.report_data)
-        stats = self.__stats.calculate_statistics()
+    def create_html(self, step_rows=None, stats=None):
+        if step_rows is None:
+            step_rows = [self.render_step_row(step) for step in self.report_data["steps"]]
+        stats = self.__statistics(stats)
         pie_chart = self.__stats.generate_pie_chart(stats['success_rate'])
         host_chart = self.__stats.generate_host_chart(stats['host_stats'])
-        
-        template = Template("""
-        <!DOCTYPE html>
-        <html lang="en">
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>MITRE Caldera Operation Report</title>
-        </head>
-        <body style="font-family: Arial, sans-serif; margin: 20px;">
-            <h1 style="color: #333;">MITRE Caldera Operation Report</h1>
-            <h2 style="color: #333;">Operation: {{ report.name }}</h2>
-            {# In case the operation is executed in multiple clients, we show the list of 
-            # clients.
-            # In theory, the operation should be executed in only one client. #}
-            {% if report.group|length == 1 %}
-            <h2 style="color: #333;">Client: {{ report.group[0] }}</h2>
-            {% else %}
-            <h2 style="color: #333;">Clients: {{ report.group|join(', ') }}</h2>
-            {% endif %}
-            
-            <div style="display: flex; flex-wrap: wrap; gap: 20px; margin-bottom: 30px;">
-                <div style="flex: 1; min-width: 300px; padding: 20px; border-radius: 8px; 
-                            background-color: #f8f9fa; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">
-                    <h3 style="color: #333;">Overall Operation Statistics</h3>
-                    <div style="text-align: center; margin: 20px 0;">
-                        <img src="data:image/png;base64,{{ pie_chart }}" alt="Success Rate Pie 
-                            Chart" style="max-width: 100%; height: auto;">
-                    </div>
-                </div>
-                
-                <div style="flex: 2; min-width: 300px; padding: 20px; border-radius: 8px; 
-                            background-color: #f8f9fa; box-shadow: 0 2px 4px rgba(0,0,0,0.1);">
-                    <h3 style="color: #333;">Per-Host Success Rates</h3>
-                    <div style="text-align: center; margin: 20px 0;">
-                        <img src="data:image/png;base64,{{ host_chart }}" alt="Host Success Rates" \
-                            style="max-width: 100%; height: auto;">
-                    </div>
-                </div>
-            </div>
-            
-            <h2 style="color: #333;">Hosts Involved</h2>
-            <table style="width: 100%; border-collapse: collapse; margin-bottom: 20px;">
-                <tr>
-                    <th style="border: 1px solid #ddd; padding: 8px; text-align: left; 
-                            background-color: #f4f4f4;">Paw</th>
-                    <th style="border: 1px solid #ddd; padding: 8px; text-align: left; 
-                            background-color: #f4f4f4;">Host</th>
-                    <th style="border: 1px solid #ddd; padding: 8px; text-align: left; 
-                            background-color: #f4f4f4;">Platform</th>
-                    <th style="border: 1px solid #ddd; padding: 8px; text-align: left; 
-                            background-color: #f4f4f4;">Privilege</th>
-                    <th style="border: 1px solid #ddd; padding: 8px; text-align: left;  
-                            background-color: #f4f4f4;">IP Address</th>
-                </tr>
-                {% for host in report.hosts %}
-                <tr>
-                    <td style="border: 1px solid #ddd; padding: 8px; text-align: left;">
-                    {{ host.paw }}</td>
-                    <td style="border: 1px solid #ddd; padding: 8px; text-align: left;">
-                    {{ host.host }}</td>
-                    <td style="border: 1px solid #ddd; padding: 8px; text-align: left;">
-                    {{ host.platform }}</td>
-                    <td style="border: 1px solid #ddd; padding: 8px; text-align: left;">
-                    {{ host.privilege }}</td>
-                    <td style="border: 1px solid #ddd; padding: 8px; text-align: left;">
-                    {{ host.ip }}</td>
-                </tr>
-                {% endfor %}
-            </table>
-            
-            <h2 style="color: #333;">Executed Steps</h2>
-            <table style="width: 100%; border-collapse: collapse; margin-bottom: 20px;">
-                <tr>
-                    <th style="border: 1px solid #ddd; padding: 8px; text-align: left; 
-                    background-color: #f4f4f4;">Host</th>
-                    <th style="border: 1px solid #ddd; padding: 8px; text-align: left; 
-                    background-color: #f4f4f4;">Step Name</th>
-                    <th style="border: 1px solid #ddd; padding: 8px; text-align: left; 
-                    background-color: #f4f4f4;">Technique ID</th>
-                    <th style="border: 1px solid #ddd; padding: 8px; text-align: left; 
-                    background-color: #f4f4f4;">Command</th>
-                    <th style="border: 1px solid #ddd; padding: 8px; text-align: left; 
-                    background-color: #f4f4f4;">PlainText Command</th>
-                    <th style="border: 1px solid #ddd; padding: 8px; text-align: left; 
-                    background-color: #f4f4f4;">Platform</th>
-                    <th style="border: 1px solid #ddd; padding: 8px; text-align: left; 
-                    background-color: #f4f4f4;">Description</th>
-                    <th style="border: 1px solid #ddd; padding: 8px; text-align: left; 
-                    background-color: #f4f4f4;">Output</th>
-                    <th style="border: 1px solid #ddd; padding: 8px; text-align: left; 
-                    background-color: #f4f4f4;">Status</th>
-                </tr>
-                {% for step in report.steps %}
-                <tr>
-                    <td style="border: 1px solid #ddd; padding: 8px; text-align: left;">
-                    {{ step.host }}</td>
-                    <td style="border: 1px solid #ddd; padding: 8px; text-align: left;">
-                    {{ step.name }}</td>
-                    <td style="border: 1px solid #ddd; padding: 8px; text-align: left;">
-                    {{ step.technique_id }}</td>
-                    <td style="border: 1px solid #ddd; padding: 8px; text-align: left;">
-                    {{ step.command }}</td>
-                    <td style="border: 1px solid #ddd; padding: 8px; text-align: left;">
-                    {{ step.plaintext_command }}</td>
-                    <td style="border: 1px solid #ddd; padding: 8px; text-align: left;">
-                    {{ step.platform }}</td>
-                    <td style="border: 1px solid #ddd; padding: 8px; text-align: left;">
-                    {{ step.description }}</td>
-                    <td style="border: 1px solid #ddd; padding: 8px; text-align: left;">
-                    {{ step.output }}</td>
-                    <td style="border: 1px solid #ddd; padding: 8px; text-align: left;">
-                    {{ step.status }}</td>
-                </tr>
-                {% endfor %}
-            </table>
-            
-            <h2 style="color: #333;">Operation Outcome</h2>
-            <p>The operation executed multiple techniques successfully on the involved hosts.</p>
-        </body>
-        </html>
-        """)
-        return template.render(report=self.report_data, stats=stats, pie_chart=pie_chart, \
-                            host_chart=host_chart)
\ No newline at end of file
+        return REPORT_TEMPLATE.render(report=self.report_data, stats=stats, pie_chart=pie_chart,
+                                      host_chart=host_chart, step_rows=step_rows,
+                                      chart_mime=self.__stats.chart_mime())
+
+    # PRE: The same as create_html.
+    # POST: Returns a function without parameters that returns an iterator with the chunks of
+    #       the HTML of the report, rendered as they are read (Template.generate). The whole
+    #       HTML is never in memory, and each call renders it again from the beginning, so the
+    #       upload can be retried. The statistics and the charts are calculated only once,
+    #       and the charts are awaited from the ChartRenderer, if any.
+    async def create_html_stream(self, step_rows=None, stats=None):
+        report_data = self.report_data
+        stats = self.__statistics(stats)
+        if self.__charts is not None:
+            pie_chart, host_chart = await self.__charts.render(stats)
+        else:
+            pie_chart = self.__stats.generate_pie_chart(stats['success_rate'])
+            host_chart = self.__stats.generate_host_chart(stats['host_stats'])
+        context = {"report": report_data, "stats": stats, "pie_chart": pie_chart,
+                   "host_chart": host_chart, "chart_mime": self.__stats.chart_mime()}
+
+        def chunks():
+            rows = step_rows
+            if rows is None:
+                rows = (self.render_step_row(step) for step in report_data["steps"])
+            return REPORT_TEMPLATE.generate(step_rows=rows, **context)
+        return chunks
+
+    # PRE: <stats> is an optional dictionary with the statistics of the steps
+    # POST: Returns <stats>, or the statistics calculated from the steps of the report if it
+    #       is None
+    def __statistics(self, stats):
+        ##statistics = Statistics(self.report_data)
+        if stats is None:
+            self.__stats.setData(self.report_data)
+            stats = self.__stats.calculate_statistics()
+        return stats
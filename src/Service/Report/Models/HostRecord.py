@@ -0,0 +1,64 @@
+"""
+Author: 	Gari Arellano
+Date:		18-10-2026
+Project: 	Atlassian
+Filename:	HostRecord.py
+Description:
+  This class represents a host of the relevant data of a Caldera report. Like StepRecord, it
+  uses __slots__ and interned strings, and it can be read as an object or as a dictionary.
+"""
+
+import sys
+
+class HostRecord:
+    FIELDS = ("paw", "host", "group", "platform", "ip", "privilege")
+
+    __slots__ = FIELDS
+
+    def __init__(self, paw="", host="", group="", platform="", ip="", privilege=""):
+        self.paw = self.__intern(paw)
+        self.host = self.__intern(host)
+        self.group = self.__intern(group)
+        self.platform = self.__intern(platform)
+        self.ip = self.__intern(ip)
+        self.privilege = self.__intern(privilege)
+
+    # PRE: <key> is the name of a field
+    # POST: Returns the value of the field, so the record can be used as the old dictionary
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    # PRE: <key> is the name of a field
+    # POST: Returns the value of the field, or <default> if it is not a field
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.FIELDS else default
+
+    def __contains__(self, key):
+        return key in self.FIELDS
+
+    def __eq__(self, other):
+        if not isinstance(other, HostRecord):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"HostRecord({self.to_dict()!r})"
+
+    # PRE: None
+    # POST: Returns a dictionary with the host information
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    # PRE: <data> is a dictionary with the fields of the host
+    # POST: Returns a new HostRecord with the fields of <data>
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{field: data[field] for field in cls.FIELDS if field in data})
+
+    # PRE: <value> is the value of a field
+    # POST: Returns the interned value if it is a string, or the value itself otherwise
+    @staticmethod
+    def __intern(value):
+        return sys.intern(value) if type(value) is str else value
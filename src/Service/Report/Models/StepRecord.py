@@ -0,0 +1,91 @@
+"""
+Author: 	Gari Arellano
+Date:		18-10-2026
+Project: 	Atlassian
+Filename:	StepRecord.py
+Description:
+  This class represents a step of the relevant data of a Caldera report. It uses __slots__
+  instead of a dictionary per step, and the strings repeated between steps (host, ip, group,
+  commands...) are interned, so a large operation keeps only one copy of each of them.
+  It can be read as an object (Jinja template) or as a dictionary (Jira and statistics).
+"""
+
+import sys
+
+class StepRecord:
+    FIELDS = ("host", "ip", "group", "name", "technique_id", "command", "plaintext_command",
+              "platform", "description", "output", "status", "ability_id", "output_ref",
+              "output_size", "whitelisted")
+
+    __slots__ = FIELDS
+
+    def __init__(self, host="", ip="", group="", name="", technique_id="", command="",
+                 plaintext_command="", platform="", description="", output="", status="",
+                 ability_id="", output_ref=None, output_size=None,
+                 whitelisted=None):
+        self.host = self.__intern(host)
+        self.ip = self.__intern(ip)
+        self.group = self.__intern(group)
+        self.name = self.__intern(name)
+        self.technique_id = self.__intern(technique_id)
+        self.command = self.__intern(command)
+        self.plaintext_command = self.__intern(plaintext_command)
+        self.platform = self.__intern(platform)
+        self.description = self.__intern(description)
+        self.output = output
+        self.status = self.__intern(status)
+        self.ability_id = self.__intern(ability_id)
+        # When the output was spilled to the OutputStore, <output> is only a preview and
+        # <output_ref> the reference of the full output of <output_size> bytes
+        self.output_ref = output_ref
+        self.output_size = output_size
+        # Decision of the whitelist taken when the step was extracted, so the tickets don't
+        # check the whitelist again
+        self.whitelisted = whitelisted
+
+    # PRE: <key> is the name of a field
+    # POST: Returns the value of the field, so the record can be used as the old dictionary
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    # PRE: <key> is the name of a field
+    # POST: Returns the value of the field, or <default> if it is not a field
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self.FIELDS else default
+
+    def __contains__(self, key):
+        return key in self.FIELDS
+
+    # The strings are interned again when a record is received from another process
+    def __getstate__(self):
+        return tuple(getattr(self, field) for field in self.FIELDS)
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def __eq__(self, other):
+        if not isinstance(other, StepRecord):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"StepRecord({self.to_dict()!r})"
+
+    # PRE: None
+    # POST: Returns a dictionary with the step information
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    # PRE: <data> is a dictionary with the fields of the step
+    # POST: Returns a new StepRecord with the fields of <data>
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{field: data[field] for field in cls.FIELDS if field in data})
+
+    # PRE: <value> is the value of a field
+    # POST: Returns the interned value if it is a string, or the value itself otherwise
+    @staticmethod
+    def __intern(value):
+        return sys.intern(value) if type(value) is str else value
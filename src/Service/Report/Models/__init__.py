@@ -0,0 +1,4 @@
+from .StepRecord import StepRecord
+from .HostRecord import HostRecord
+
+__all__ = ['StepRecord', 'HostRecord']
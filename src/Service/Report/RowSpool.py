@@ -0,0 +1,61 @@
+"""
+Author: 	Gari Arellano
+Date:		18-10-2026
+Project: 	Atlassian
+Filename:	RowSpool.py
+Description:
+  This file contains the RowSpool class which keeps the HTML rows of the steps rendered by the
+  streaming pipeline in a compressed temporary file instead of a list, so the memory of a
+  report doesn't grow with its steps. The rows are read back from the file every time the
+  spool is iterated, so the upload of the page can be retried.
+"""
+
+import gzip
+import json
+import tempfile
+
+class RowSpool:
+    # PRE: True
+    # POST: Creates an empty spool in an anonymous temporary file, removed when the spool is
+    #       closed or released
+    def __init__(self):
+        self.__file = tempfile.TemporaryFile()
+        self.__writer = gzip.GzipFile(fileobj=self.__file, mode="wb", compresslevel=1)
+        self.__count = 0
+
+    def __len__(self):
+        return self.__count
+
+    # PRE: <row> is the HTML of a row and finish() was not called
+    # POST: Writes the row at the end of the spool
+    def append(self, row):
+        # Each row is a JSON string in its own line, so the line breaks of the HTML are kept
+        self.__writer.write(json.dumps(row).encode("utf-8") + b"\n")
+        self.__count += 1
+
+    # PRE: True
+    # POST: Ends the writing. The spool can only be read after it.
+    def finish(self):
+        if self.__writer is not None:
+            self.__writer.close()
+            self.__writer = None
+
+    # PRE: finish() was called
+    # POST: Yields the rows in the order they were appended, read from the file
+    def __iter__(self):
+        self.__file.seek(0)
+        with gzip.GzipFile(fileobj=self.__file, mode="rb") as reader:
+            for line in reader:
+                yield json.loads(line)
+
+    # PRE: True
+    # POST: Closes and removes the temporary file
+    def close(self):
+        self.finish()
+        self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
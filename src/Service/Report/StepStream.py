@@ -0,0 +1,78 @@
+"""
+Author: 	Gari Arellano
+Date:		18-10-2026
+Project: 	Atlassian
+Filename:	StepStream.py
+Description:
+  This file contains the StepStream class which sends the steps of a report, as they are
+  extracted, to several consumers at the same time (the Jira tickets, the statistics and the
+  HTML rows). Each consumer has a bounded queue, so the extraction never gets more than
+  <buffer_size> steps ahead of the slowest consumer and the steps already consumed by all of
+  them are released.
+"""
+
+import asyncio
+import logging
+
+logger = logging.getLogger('test_report')
+
+class StepStream:
+    # Marks the end of the stream in the queues
+    END = object()
+
+    # PRE: <steps> is an iterable (usually a generator) with the steps
+    #      <buffer_size> is the maximum number of steps waiting in the queue of a consumer
+    #      <yield_every> is the number of steps extracted before letting the consumers run
+    def __init__(self, steps, buffer_size=1000, yield_every=64):
+        self.__steps = steps
+        self.__buffer_size = buffer_size
+        self.__yield_every = max(1, yield_every)
+
+    # PRE: <consumers> are coroutine functions that receive an async iterator with the steps
+    # POST: Sends every step to all the consumers and returns a list with their results, in
+    #       the same order. If the extraction or any consumer fails, the others are cancelled
+    #       and the exception is raised.
+    async def run(self, *consumers):
+        queues = [asyncio.Queue(maxsize=self.__buffer_size) for _ in consumers]
+        tasks = [asyncio.create_task(consumer(self.__subscribe(queue)))
+                 for consumer, queue in zip(consumers, queues)]
+        producer = asyncio.create_task(self.__produce(queues))
+        try:
+            done, _ = await asyncio.wait([producer, *tasks],
+                                         return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                if task.exception() is not None:
+                    raise task.exception()
+            count = producer.result()
+            logger.info(f"{count} steps streamed to {len(consumers)} consumers")
+            return [task.result() for task in tasks]
+        finally:
+            for task in [producer, *tasks]:
+                if not task.done():
+                    task.cancel()
+            await asyncio.gather(producer, *tasks, return_exceptions=True)
+
+    # PRE: <queues> are the queues of the consumers
+    # POST: Puts every step in all the queues, followed by END. Returns the number of steps.
+    async def __produce(self, queues):
+        count = 0
+        for step in self.__steps:
+            for queue in queues:
+                # It waits while the queue is full (the consumer is behind)
+                await queue.put(step)
+            count += 1
+            if count % self.__yield_every == 0:
+                # The extraction doesn't wait for anything, so the consumers have to be let run
+                await asyncio.sleep(0)
+        for queue in queues:
+            await queue.put(self.END)
+        return count
+
+    # PRE: <queue> is the queue of a consumer
+    # POST: Yields the steps of the queue until END
+    async def __subscribe(self, queue):
+        while True:
+            step = await queue.get()
+            if step is self.END:
+                return
+            yield step
@@ -10,9 +10,14 @@ Description:
 
 import os
 from dotenv import load_dotenv
-import aiohttp
+from ..Http import HttpClient
+from .WhiteListSnapshot import WhiteListSnapshot
+import asyncio
+import hashlib
+import io
+import json
+import time
 import zipfile
-import ssl
 import logging
 
 logger = logging.getLogger('test_report')
@@ -23,12 +28,56 @@ class WhiteList:
         load_dotenv()
         self.__token = os.getenv("gitlab_token")
         self.__url = os.getenv("gitlab_url")
-        self.__zip_filename = "whitelist_repo.zip"
-        # repository must exist in the same directory as the script
-        self.__output_dir = "repository"
+        # Directory of the whitelists inside the archive of the repository
         self.__name_dir = "caldera-whitelist-master"
+        # File with the ETag, the hash and the index of the last archive downloaded, so the
+        # next run doesn't download it again if it didn't change
+        self.__state_file = os.getenv("whitelist_state_file", "whitelist_index.json")
+        self.__etag = None
+        self.__digest = None
+        # Maximum number of whitelist decisions memoized by each snapshot
+        self.__decision_cache_size = int(os.getenv("whitelist_decision_cache_size", "4096"))
+        # The server uses a self-signed certificate and we don't want to verify it
+        self.__client = HttpClient("gitlab", ssl=False)
+        # Immutable snapshot of the whitelists. It is replaced as a whole (never modified) when
+        # they change, so it can be read from any thread or task.
+        self.__snapshot = None
+        self.__refresher = None
         logger.info("WhiteList initialized successfully")
 
+    # PRE: True
+    # POST: Stops the background refresher, if any, and closes the connections to GitLab.
+    async def close(self):
+        if self.__refresher is not None:
+            self.__refresher.cancel()
+            try:
+                await self.__refresher
+            except asyncio.CancelledError:
+                pass
+            self.__refresher = None
+        await self.__client.close()
+
+    # PRE: <interval> is the number of seconds between two refreshes
+    # POST: Starts a background task that downloads the whitelists every <interval> seconds
+    #       and swaps in the new snapshot when they change. The extractions that already took
+    #       a snapshot keep using it. The task is stopped by close().
+    def start_refresher(self, interval):
+        if self.__refresher is None:
+            logger.info(f"Refreshing the whitelists every {interval} seconds")
+            self.__refresher = asyncio.create_task(self.__refresh(interval))
+
+    # PRE: <interval> is the number of seconds between two refreshes
+    # POST: Downloads the whitelists every <interval> seconds until it is cancelled. A failed
+    #       refresh keeps the current snapshot.
+    async def __refresh(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if await self.download_whitelists():
+                    logger.info(f"Whitelists refreshed to version {self.__snapshot.version}")
+            except Exception as e:
+                logger.error(f"Error refreshing the whitelists: {str(e)}")
+
     # PRE: True
     # POST: Initializes the report by downloading the whitelists from Confluence.
     #       This method is called before creating the report to ensure that the whitelists are
@@ -45,91 +94,150 @@ class WhiteList:
     
     
     # PRE: True.
-    # POST: Downloads the zip file from the specified URL and saves it to the local directory.
+    # POST: Downloads the archive of the repository unless it didn't change since the last
+    #       download (the server answers 304 to If-None-Match). Returns the content of the
+    #       archive, or None if it didn't change.
     async def __download_zip(self):
         logger.info("Starting whitelist repository download")
+        headers = {"Authorization": f"Bearer {self.__token}"}
+        if self.__etag and self.__snapshot is not None:
+            headers["If-None-Match"] = self.__etag
         try:
-            async with aiohttp.ClientSession() as session:
-                # Create an unverified SSL context to ignore certificate verification
-                # This is because the server uses a self-signed certificate
-                # and we don't want to verify it
-                ssl_context = ssl._create_unverified_context()
-                async with session.get(self.__url, headers={"Authorization": 
-                                                          f"Bearer {self.__token}"},
-                                                          ssl=ssl_context) as response:
-                    if response.status == 200:
-                        content = await response.read()
-                        with open(self.__zip_filename, "wb") as f:
-                            f.write(content)
-                        logger.info(f"Whitelist repository downloaded successfully to {self.__zip_filename}")
-                    else:
-                        error_text = await response.text()
-                        logger.error(f"Failed to download whitelist repository. Status: {response.status}, Error: {error_text}")
-                        raise Exception(f"Failed to download whitelist repository: {error_text}")
+            async with self.__client.request("GET", self.__url, headers=headers) as response:
+                if response.status == 304:
+                    logger.info("Whitelist repository not modified, download skipped")
+                    return None
+                if response.status == 200:
+                    content = await response.read()
+                    self.__etag = response.headers.get("ETag")
+                    logger.info(f"Whitelist repository downloaded successfully ({len(content)} bytes)")
+                    return content
+                else:
+                    error_text = await response.text()
+                    logger.error(f"Failed to download whitelist repository. Status: {response.status}, Error: {error_text}")
+                    raise Exception(f"Failed to download whitelist repository: {error_text}")
         except Exception as e:
             logger.error(f"Error downloading whitelist repository: {str(e)}")
             raise
-    # PRE: True.
-    # POST: Extracts the zip file to the specified output directory.
-    def __extract_zip(self):
-        logger.info(f"Extracting whitelist repository to {self.__output_dir}")
-        try:
-            with zipfile.ZipFile(self.__zip_filename, 'r') as zip_ref:
-                zip_ref.extractall(self.__output_dir)
-            # Remove the zip file after extraction
-            os.remove(self.__zip_filename)
-            logger.info("Whitelist repository extracted successfully")
-        except Exception as e:
-            logger.error(f"Error extracting whitelist repository: {str(e)}")
-            raise
+
+    # PRE: <content> is the content of the zip archive of the repository.
+    # POST: Returns the index group -> frozenset of ability ids built from the whitelists of
+    #       the archive, read in memory. Only the files of the whitelist directory are read.
+    def __build_index(self, content):
+        index = {}
+        with zipfile.ZipFile(io.BytesIO(content)) as archive:
+            for member in archive.infolist():
+                parts = member.filename.split("/")
+                if member.is_dir() or len(parts) != 2 or parts[0] != self.__name_dir:
+                    continue
+                text = archive.read(member).decode("utf-8")
+                index[parts[1]] = frozenset(
+                    line.strip() for line in text.splitlines() if line.strip()
+                )
+        return index
 
     # PRE: True.
-    # POST: Downloads the zip file and extracts it to the specified output directory.
+    # POST: Downloads the archive of the repository and loads its whitelists in the index.
+    #       If the archive didn't change (same ETag or same content), the index is not rebuilt.
+    #       Returns True if the index was rebuilt, False otherwise.
     async def download_whitelists(self):
         logger.info("Starting whitelist download process")
         try:
-            await self.__download_zip()
-            self.__extract_zip()
+            # The index saved by the previous run is reused if the archive didn't change
+            if self.__snapshot is None and os.path.exists(self.__state_file):
+                self.load_index()
+            content = await self.__download_zip()
+            if content is None:
+                return False
+            digest = hashlib.sha256(content).hexdigest()
+            if digest == self.__digest and self.__snapshot is not None:
+                logger.info("Whitelist repository content didn't change, index kept")
+                self.__save_state()
+                return False
+            started = time.perf_counter()
+            index = self.__build_index(content)
+            self.__digest = digest
+            self.__set_index(index, time.perf_counter() - started)
+            self.__save_state()
             logger.info("Whitelist download process completed successfully")
+            return True
         except Exception as e:
             logger.error(f"Error in whitelist download process: {str(e)}")
             raise
 
+    # PRE: True.
+    # POST: Loads the index saved by the last download (with its ETag and hash), or an empty
+    #       index if there is none. Returns a dictionary with the size of the index and the
+    #       seconds it took to load.
+    def load_index(self):
+        started = time.perf_counter()
+        index = {}
+        try:
+            with open(self.__state_file, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            index = {group: frozenset(abilities) for group, abilities in state["index"].items()}
+            self.__etag = state.get("etag")
+            self.__digest = state.get("sha256")
+        except FileNotFoundError:
+            logger.warning(f"Whitelist index '{self.__state_file}' does not exist")
+            logger.warning("Please call download_whitelists() first")
+        except (ValueError, KeyError, AttributeError) as e:
+            logger.warning(f"Invalid whitelist index '{self.__state_file}': {str(e)}")
+        self.__set_index(index, time.perf_counter() - started)
+        return self.get_stats()
+
+    # PRE: True.
+    # POST: Returns a dictionary with the version, the number of groups and abilities of the
+    #       current snapshot and the seconds it took to load.
+    def get_stats(self):
+        return self.snapshot().get_stats()
+
+    # PRE: True.
+    # POST: Returns the current snapshot of the whitelists. If it is not loaded yet, the index
+    #       saved by the last download is loaded.
+    def snapshot(self):
+        snapshot = self.__snapshot
+        if snapshot is None:
+            self.load_index()
+            snapshot = self.__snapshot
+        return snapshot
+
     # PRE: <ability_id> is a string that represents the ability ID.
     #      <group> is a string that represents the group name.
-    #      <last_seen> is a string that represents the last seen date.
-    # POST: Returns True if the ability_id is in the whitelist of the group, False otherwise.
+    # POST: Returns True if the ability_id is in the current whitelist of the group, False
+    #       otherwise. To check several abilities against the same version, use snapshot().
     def is_in_whitelist(self, ability_id, group):
-        logger.debug(f"Checking if ability {ability_id} is in whitelist for group {group}")
-        # Check if the group has a whitelist
-        # Ensure we're in the original directory
-        original_dir = os.getcwd()
-        
-        # Check if output directory exists, if not create it
-        if not os.path.exists(self.__output_dir):
-            logger.warning(f"Output directory '{self.__output_dir}' does not exist")
-            logger.warning("Please call download_whitelists() first")
-            os.chdir(original_dir)  # Return to original directory
-            return False
-            
-        os.chdir(self.__output_dir)
-        if os.path.exists(self.__name_dir):
-            os.chdir(self.__name_dir)
-            # Check if the group has a whitelist
-            if os.path.exists(group):
-                logger.debug(f"Group '{group}' has a whitelist")
-                # Check if the ability_id is in the whitelist
-                with open(f"{group}", "r") as f:
-                    logger.debug(f"Searching for '{ability_id}' in whitelist of '{group}'")
-                    lines = f.readlines()
-                    for line in lines:
-                        if line.strip() == ability_id:
-                            logger.debug(f"Ability {ability_id} found in whitelist for group {group}")
-                            # Return to original directory before returning result
-                            os.chdir(original_dir)
-                            return True
-        
-        # Return to original directory before returning result
-        os.chdir(original_dir)
-        logger.debug(f"Ability {ability_id} not found in whitelist for group {group}")
-        return False
+        found = self.snapshot().is_in_whitelist(ability_id, group)
+        logger.debug(
+            f"Ability {ability_id} {'found' if found else 'not found'} in whitelist for "
+            f"group {group}"
+        )
+        return found
+
+    # PRE: <index> is a dictionary group -> frozenset of ability ids
+    #      <seconds> is the time it took to build it
+    # POST: Replaces the snapshot by a new one with <index>. The version is the beginning of
+    #       the hash of the archive.
+    def __set_index(self, index, seconds):
+        version = self.__digest[:12] if self.__digest else None
+        self.__snapshot = WhiteListSnapshot(index, version, seconds,
+                                            self.__decision_cache_size)
+        stats = self.__snapshot.get_stats()
+        logger.info(
+            f"Whitelist index {version} loaded: {stats['groups']} groups, "
+            f"{stats['abilities']} abilities in {stats['load_seconds']:.3f}s"
+        )
+
+    # PRE: True.
+    # POST: Saves the ETag, the hash and the index of the last archive downloaded.
+    def __save_state(self):
+        state = {
+            "etag": self.__etag,
+            "sha256": self.__digest,
+            "index": self.__snapshot.to_dict()
+        }
+        # The file is written aside and renamed, so a crash never leaves half an index
+        temporary = f"{self.__state_file}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(state, f)
+        os.replace(temporary, self.__state_file)
@@ -0,0 +1,97 @@
+"""
+Author: 	Gari Arellano
+Date:		18-10-2026
+Project: 	Atlassian
+Filename:	WhiteListSnapshot.py
+Description:
+  This file contains the WhiteListSnapshot class, an immutable version of the whitelists of
+  the Caldera clients. The WhiteList class replaces its snapshot as a whole when the whitelists
+  change, so an extraction that took a snapshot keeps using the same whitelists until it ends,
+  and the report can record the version it used.
+  The decisions are memoized in a bounded LRU cache, because the same (ability, group) pairs
+  are checked again and again for every host and operation that uses the snapshot.
+"""
+
+from collections import OrderedDict
+from types import MappingProxyType
+import datetime
+import threading
+
+class WhiteListSnapshot:
+    # PRE: <index> is a dictionary group -> frozenset of ability ids
+    #      <version> is a string that identifies the whitelists (hash of the archive), or None
+    #      if they were never downloaded
+    #      <load_seconds> is the time it took to build the index
+    #      <decision_cache_size> is the maximum number of decisions memoized, 0 to disable it
+    def __init__(self, index, version=None, load_seconds=0.0, decision_cache_size=4096):
+        self.__index = MappingProxyType(dict(index))
+        self.__version = version
+        self.__load_seconds = load_seconds
+        self.__loaded_at = datetime.datetime.now().isoformat(timespec="seconds")
+        # (ability_id, group) -> decision. It never changes a decision (the index is
+        # immutable), so it doesn't break the immutability of the snapshot.
+        self.__decision_cache_size = decision_cache_size
+        self.__decisions = OrderedDict()
+        self.__decisions_lock = threading.Lock()
+        self.__hits = 0
+        self.__misses = 0
+
+    # The index is a read-only view, which can't be pickled. The snapshot is rebuilt from a
+    # copy of it when it is sent to another process, with an empty decision cache.
+    def __reduce__(self):
+        return (WhiteListSnapshot, (dict(self.__index), self.__version, self.__load_seconds,
+                                    self.__decision_cache_size))
+
+    @property
+    def version(self):
+        return self.__version
+
+    @property
+    def loaded_at(self):
+        return self.__loaded_at
+
+    # PRE: True
+    # POST: Returns the snapshot itself, so a snapshot can be used wherever a WhiteList is
+    #       expected
+    def snapshot(self):
+        return self
+
+    # PRE: <ability_id> is a string that represents the ability ID.
+    #      <group> is a string that represents the group name.
+    # POST: Returns True if the ability_id is in the whitelist of the group, False otherwise.
+    def is_in_whitelist(self, ability_id, group):
+        key = (ability_id, group)
+        with self.__decisions_lock:
+            found = self.__decisions.get(key)
+            if found is not None:
+                self.__decisions.move_to_end(key)
+                self.__hits += 1
+                return found
+            self.__misses += 1
+            found = ability_id in self.__index.get(group, ())
+            if self.__decision_cache_size > 0:
+                self.__decisions[key] = found
+                if len(self.__decisions) > self.__decision_cache_size:
+                    # The least recently used decision is dropped
+                    self.__decisions.popitem(last=False)
+            return found
+
+    # PRE: True
+    # POST: Returns a dictionary group -> sorted list of ability ids
+    def to_dict(self):
+        return {group: sorted(abilities) for group, abilities in self.__index.items()}
+
+    # PRE: True
+    # POST: Returns a dictionary with the version, the number of groups and abilities, the
+    #       seconds it took to load the snapshot and the counters of the decision cache.
+    def get_stats(self):
+        return {
+            "version": self.__version,
+            "groups": len(self.__index),
+            "abilities": sum(len(abilities) for abilities in self.__index.values()),
+            "load_seconds": self.__load_seconds,
+            "loaded_at": self.__loaded_at,
+            "decision_hits": self.__hits,
+            "decision_misses": self.__misses,
+            "cached_decisions": len(self.__decisions)
+        }
@@ -2,5 +2,6 @@ from .GenerateHtml import GenerateHtml
 from .CreateReport import CreateReport
 from .CreatePage import CreatePage
 from .WhiteList import WhiteList
+from .WhiteListSnapshot import WhiteListSnapshot
 
-__all__ = ['GenerateHtml', 'CreateReport', 'CreatePage', 'WhiteList']
\ No newline at end of file
+__all__ = ['GenerateHtml', 'CreateReport', 'CreatePage', 'WhiteList', 'WhiteListSnapshot']
\ No newline at end of file
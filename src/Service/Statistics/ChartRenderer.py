@@ -0,0 +1,146 @@
+"""
+Author: 	Gari Arellano
+Date:		18-10-2026
+Project: 	Atlassian
+Filename:	ChartRenderer.py
+Description:
+    This file contains the ChartRenderer class, which renders the charts of the reports in a
+    dedicated process pool, so matplotlib never blocks the event loop (and the HTTP requests of
+    the other operations). The workers use the headless Agg backend and are warmed once when
+    they start: pyplot and the fonts are loaded before the first chart is requested.
+    With a ChartCache, a chart already rendered with the same values is not rendered again.
+"""
+
+from .Statistics import Statistics
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import logging
+
+logger = logging.getLogger('test_report')
+
+# Statistics object of a worker process, created once by init_chart_worker
+chart_statistics = None
+
+# PRE: True
+# POST: Renders a chart in the worker process, so matplotlib (with the Agg backend), the fonts
+#       and the pyplot state are ready for the charts of the reports.
+def init_chart_worker():
+    global chart_statistics
+    chart_statistics = Statistics()
+    chart_statistics.generate_pie_chart(50.0)
+
+# PRE: True
+# POST: Does nothing. It is submitted to start the workers of the pool.
+def warm_chart_worker():
+    return True
+
+# PRE: The worker was initialized by init_chart_worker
+#      <chart> is "pie_chart" or "host_chart" and <argument> its data
+# POST: Returns the base64 PNG of the chart
+def render_chart(chart, argument):
+    return getattr(chart_statistics, f"generate_{chart}")(argument)
+
+class ChartRenderer:
+    # PRE: <workers> is the number of processes that render the charts. With 0, the charts are
+    #      rendered in the calling process (blocking the event loop, as it was done before).
+    #      <cache> is an optional ChartCache object with the charts already rendered
+    def __init__(self, workers=1, cache=None):
+        self.__workers = workers
+        self.__cache = cache
+        # key -> task of the charts being rendered, so the operations that need the same chart
+        # at the same time render it only once
+        self.__pending = {}
+        self.__pool = None
+        # Statistics object of the charts rendered in this process, and its backend
+        self.__statistics = Statistics()
+
+    # PRE: True
+    # POST: Starts the processes of the pool and waits until they are warmed. It is called by
+    #       the first chart that is not in the cache, so a run that doesn't render any chart
+    #       (no finished operation, or all the charts cached) never starts matplotlib.
+    async def start(self):
+        if self.__workers <= 0 or self.__pool is not None:
+            return self
+        logger.info(f"Starting {self.__workers} chart rendering processes")
+        self.__pool = ProcessPoolExecutor(max_workers=self.__workers,
+                                          initializer=init_chart_worker)
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.__pool, warm_chart_worker)
+                               for _ in range(self.__workers)))
+        return self
+
+    # PRE: True
+    # POST: Stops the processes of the pool and logs the hit rate of the cache
+    async def close(self):
+        if self.__cache is not None:
+            stats = self.__cache.get_stats()
+            logger.info(
+                f"Chart cache: {stats['hits']} hits, {stats['disk_hits']} disk hits, "
+                f"{stats['misses']} misses ({stats['hit_rate']:.1f}% hit rate)"
+            )
+        if self.__pool is not None:
+            pool, self.__pool = self.__pool, None
+            await asyncio.get_running_loop().run_in_executor(None, pool.shutdown)
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    # PRE: <success_rate> is a float that represents the overall success rate of the operation.
+    # POST: Returns the base64 PNG of the pie chart (Statistics.generate_pie_chart)
+    async def pie_chart(self, success_rate):
+        return await self.__render("pie_chart", success_rate)
+
+    # PRE: <host_stats> is a dictionary that contains the success rates for each host.
+    # POST: Returns the base64 PNG of the host chart (Statistics.generate_host_chart)
+    async def host_chart(self, host_stats):
+        return await self.__render("host_chart", host_stats)
+
+    # PRE: <stats> is a dictionary with the statistics of a report
+    # POST: Returns a tuple with the pie chart and the host chart of the report, rendered at
+    #       the same time when there are several workers
+    async def render(self, stats):
+        return tuple(await asyncio.gather(self.pie_chart(stats["success_rate"]),
+                                          self.host_chart(stats["host_stats"])))
+
+    # PRE: <chart> is "pie_chart" or "host_chart" and <argument> its data
+    # POST: Returns the base64 PNG of the chart, from the cache or rendered (in the pool if
+    #       there are workers)
+    async def __render(self, chart, argument):
+        if self.__cache is None:
+            return await self.__draw(chart, argument)
+        key = self.__key(chart, argument)
+        if key in self.__pending:
+            return await asyncio.shield(self.__pending[key])
+        image = self.__cache.get(key)
+        if image is None:
+            task = asyncio.ensure_future(self.__draw(chart, argument))
+            self.__pending[key] = task
+            try:
+                image = await asyncio.shield(task)
+            finally:
+                del self.__pending[key]
+            self.__cache.put(key, image)
+        return image
+
+    # PRE: <chart> is "pie_chart" or "host_chart" and <argument> its data
+    # POST: Returns the key of the chart in the cache: the digest of the values it draws (the
+    #       rates, and the hosts in their order), the version of the charts and the backend
+    def __key(self, chart, argument):
+        if chart == "host_chart":
+            argument = [[host, stats["success_rate"]] for host, stats in argument.items()]
+        return self.__cache.key(chart, Statistics.CHART_VERSION,
+                                self.__statistics.getBackend(), argument)
+
+    # PRE: <chart> is "pie_chart" or "host_chart" and <argument> its data
+    # POST: Returns the base64 PNG of the chart, rendered in the pool (started on the first
+    #       chart) if there are workers
+    async def __draw(self, chart, argument):
+        if self.__workers > 0 and self.__pool is None:
+            await self.start()
+        if self.__pool is None:
+            return getattr(self.__statistics, f"generate_{chart}")(argument)
+        return await asyncio.get_running_loop().run_in_executor(self.__pool, render_chart,
+                                                                chart, argument)
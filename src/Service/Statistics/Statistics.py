@@ -7,11 +7,16 @@ Description:
     This file contains the Statistics class, which is responsible for calculating and generating
     statistics from the report data. It includes methods to calculate overall success rates and
     generate pie and bar charts for visualizing the success rates of operations.
+    The charts are drawn as PNG with matplotlib or as SVG by SvgCharts (chart_backend). 
+    matplotlib is only imported when a PNG chart is drawn.
 """
 
-import matplotlib.pyplot as plt
+from .StatisticsAccumulator import StatisticsAccumulator
+from .SvgCharts import SvgCharts
+from dotenv import load_dotenv
 import base64
 from io import BytesIO
+import os
 import logging
 
 # Configure logging
@@ -27,10 +32,35 @@ logging.basicConfig(
 logger = logging.getLogger('Statistics')
 
 class Statistics:
-    def __init__(self, report_data=None):
+    # Version of the style of the charts. It is part of the key of the cached charts
+    # (ChartCache), so it has to be increased when the charts change.
+    CHART_VERSION = 1
+
+    # Backends of the charts and the MIME type of their images
+    BACKENDS = {"png": "image/png", "svg": "image/svg+xml"}
+
+    # PRE: <report_data> is an optional dictionary that contains the JSON report data.
+    #      <backend> is an optional backend of the charts ("png" or "svg"). By default it is
+    #      the chart_backend environment variable (default: png).
+    def __init__(self, report_data=None, backend=None):
         logger.info("Initializing Statistics class")
         self.data = report_data if report_data is not None else ""
+        if backend is None:
+            load_dotenv()
+            backend = os.getenv("chart_backend", "png").lower()
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown chart backend '{backend}', expected one of "
+                             f"{', '.join(self.BACKENDS)}")
+        self.__backend = backend
         logger.info(f"Report data initialized: {'Data present' if self.data else 'No data'}")
+
+    def getBackend(self):
+        return self.__backend
+
+    # PRE: True
+    # POST: Returns the MIME type of the charts, for the data URI of the images
+    def chart_mime(self):
+        return self.BACKENDS[self.__backend]
     
     # PRE: <report_data> is a dictionary that contains the JSON report data.
     # POST: Sets the data attribute to the given value.
@@ -42,12 +72,11 @@ class Statistics:
     # PRE: <report_data> is a dictionary that contains the JSON report data.
     # POST: Returns a dictionary with the calculated statistics.
     #       This includes the total number of steps, successful steps, and success rate for  
-    #       each host. 
+    #       the whole operation, each host, each group and each technique.
     #       The steps are filtered to exclude omitted steps.
+    #       The steps are traversed only once, accumulating all the totals at the same time.
     def calculate_statistics(self):
         logger.info("Starting statistics calculation")
-        total_steps = 0
-        successful_steps = 0
         
         if not self.data or "steps" not in self.data:
             logger.warning("No data or steps found in report data")
@@ -55,46 +84,26 @@ class Statistics:
                 "total_steps": 0,
                 "successful_steps": 0,
                 "success_rate": 0,
-                "host_stats": {}
+                "host_stats": {},
+                "group_stats": {},
+                "technique_stats": {}
             }
-            
-        for step in self.data["steps"]:
-            if step["status"] != "Omitted":
-                total_steps += 1
-            if step["status"] == "Success":
-                successful_steps += 1
-                
-        success_rate = (successful_steps / total_steps * 100) if total_steps > 0 else 0
-        logger.info(f"Statistics calculated - Total steps: {total_steps}, Successful steps: {successful_steps}, Success rate: {success_rate:.2f}%")
 
-        # Calculate per-host statistics
-        host_stats = {}
-        for host in self.data["hosts"]:
-            host_name = host["host"]
-            host_steps = [step for step in self.data["steps"] if step["host"] == host_name and 
-                          step["status"] != "Omitted"]
-            total_host_steps = len(host_steps)
-            successful_host_steps = sum(1 for step in host_steps if step["status"] == "Success")
-            host_success_rate = (successful_host_steps / total_host_steps * 100) \
-                if total_host_steps > 0 else 0
-            host_stats[host_name] = {
-                "total_steps": total_host_steps,
-                "successful_steps": successful_host_steps,
-                "success_rate": host_success_rate
-            }
-
-        return {
-            "total_steps": total_steps,
-            "successful_steps": successful_steps,
-            "success_rate": success_rate,
-            "host_stats": host_stats
-        }
+        accumulator = StatisticsAccumulator()
+        for step in self.data["steps"]:
+            accumulator.add(step)
+        stats = accumulator.result(self.data["hosts"])
+        logger.info(f"Statistics calculated - Total steps: {stats['total_steps']}, Successful steps: {stats['successful_steps']}, Success rate: {stats['success_rate']:.2f}%")
+        return stats
 
     # PRE: <success_rate> is a float that represents the overall success rate of the operation.
     # POST: Returns a base64 encoded string of the generated pie chart.
     #       The chart shows the overall success rate of the operation.
-    #       The chart is saved as a PNG image in memory and encoded to base64.
+    #       The chart is saved as a PNG image (or SVG) in memory and encoded to base64.
     def generate_pie_chart(self, success_rate):
+        if self.__backend == "svg":
+            return self.__encode(SvgCharts.pie_chart(success_rate))
+        plt = self.__pyplot()
         plt.figure(figsize=(4, 4))
         labels = ['Not Secure', 'Secure']
         sizes = [success_rate, 100-success_rate]
@@ -118,8 +127,11 @@ class Statistics:
     # PRE: <host_stats> is a dictionary that contains the success rates for each host.
     # POST: Returns a base64 encoded string of the generated horizontal bar chart.
     #       The chart shows the success rates for each host.
-    #       The chart is saved as a PNG image in memory and encoded to base64.
+    #       The chart is saved as a PNG image (or SVG) in memory and encoded to base64.
     def generate_host_chart(self, host_stats):
+        if self.__backend == "svg":
+            return self.__encode(SvgCharts.host_chart(host_stats))
+        plt = self.__pyplot()
         plt.figure(figsize=(10, len(host_stats) * 1.5))
         
         hosts = list(host_stats.keys())
@@ -153,4 +165,26 @@ class Statistics:
         buf = BytesIO()
         plt.savefig(buf, format='png', bbox_inches='tight', pad_inches=0.5)
         plt.close()
-        return base64.b64encode(buf.getvalue()).decode('utf-8')
\ No newline at end of file
+        return base64.b64encode(buf.getvalue()).decode('utf-8')
+
+    # PRE: <svg> is the SVG of a chart
+    # POST: Returns the SVG encoded to base64
+    @staticmethod
+    def __encode(svg):
+        return base64.b64encode(svg.encode('utf-8')).decode('utf-8')
+
+    # PRE: True
+    # POST: Returns matplotlib.pyplot with the headless Agg backend (the charts are only saved,
+    #       never shown). It is imported the first time a PNG chart is drawn. Raises
+    #       ImportError if matplotlib is not installed.
+    @staticmethod
+    def __pyplot():
+        try:
+            import matplotlib
+        except ImportError as e:
+            raise ImportError("matplotlib is required to draw the PNG charts (chart_backend=png): "
+                              "install it with 'pip install matplotlib' or set "
+                              "chart_backend=svg") from e
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        return plt
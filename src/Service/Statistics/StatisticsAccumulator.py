@@ -0,0 +1,66 @@
+"""
+Author: 	Gari Arellano
+Date:		18-10-2026
+Project: 	Atlassian
+Filename:	StatisticsAccumulator.py
+Description:
+    This file contains the StatisticsAccumulator class, which accumulates the totals of the
+    steps one by one (overall, per host, per group and per technique). It is used by the
+    Statistics class and by the streaming pipeline, which sees each step only once while it is
+    extracted.
+"""
+
+class StatisticsAccumulator:
+    def __init__(self):
+        self.total_steps = 0
+        self.successful_steps = 0
+        # Accumulators key -> [total steps, successful steps]
+        self.__host_counts = {}
+        self.__group_counts = {}
+        self.__technique_counts = {}
+
+    # PRE: <step> is a step of the relevant data (StepRecord or dictionary)
+    # POST: Adds the step to the totals. The omitted steps are not counted.
+    def add(self, step):
+        status = step["status"]
+        if status == "Omitted":
+            return
+        successful = 1 if status == "Success" else 0
+        self.total_steps += 1
+        self.successful_steps += successful
+        for counts, key in ((self.__host_counts, step["host"]),
+                            (self.__group_counts, step["group"]),
+                            (self.__technique_counts, step["technique_id"])):
+            count = counts.get(key)
+            if count is None:
+                count = counts[key] = [0, 0]
+            count[0] += 1
+            count[1] += successful
+
+    # PRE: <hosts> is the list of hosts of the relevant data
+    # POST: Returns a dictionary with the calculated statistics. Every host of <hosts> has its
+    #       statistics, even if all its steps were omitted.
+    def result(self, hosts):
+        host_stats = {}
+        for host in hosts:
+            host_stats[host["host"]] = self.__rate(*self.__host_counts.get(host["host"], (0, 0)))
+        return {
+            "total_steps": self.total_steps,
+            "successful_steps": self.successful_steps,
+            "success_rate": self.__rate(self.total_steps, self.successful_steps)["success_rate"],
+            "host_stats": host_stats,
+            "group_stats": {group: self.__rate(*count) 
+                            for group, count in self.__group_counts.items()},
+            "technique_stats": {technique: self.__rate(*count) 
+                                for technique, count in self.__technique_counts.items()}
+        }
+
+    # PRE: <total_steps> and <successful_steps> are the number of steps (not omitted) and the
+    #      number of successful steps
+    # POST: Returns a dictionary with the totals and the success rate
+    def __rate(self, total_steps, successful_steps):
+        return {
+            "total_steps": total_steps,
+            "successful_steps": successful_steps,
+            "success_rate": (successful_steps / total_steps * 100) if total_steps > 0 else 0
+        }
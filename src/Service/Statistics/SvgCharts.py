@@ -0,0 +1,128 @@
+"""
+Author: 	Gari Arellano
+Date:		18-10-2026
+Project: 	Atlassian
+Filename:	SvgCharts.py
+Description:
+    This file contains the SvgCharts class, which draws the charts of the reports as SVG
+    without matplotlib: the pie chart of the overall secure rate and the stacked horizontal
+    bar chart of the secure rate by host, with the same layout and colors as the PNG charts of
+    Statistics. The SVG is a few KB, much smaller than the PNG in the Confluence page.
+"""
+
+from html import escape
+import math
+
+class SvgCharts:
+    NOT_SECURE_COLOR = "#f44336"
+    SECURE_COLOR = "#4CAF50"
+    FONT = "font-family=\"Arial, sans-serif\""
+
+    # PRE: <success_rate> is a float that represents the overall success rate of the operation.
+    # POST: Returns the SVG of the pie chart of the overall secure rate (the same as
+    #       Statistics.generate_pie_chart): "Not Secure" is <success_rate> and "Secure" the rest,
+    #       starting at the top and counterclockwise.
+    @staticmethod
+    def pie_chart(success_rate):
+        cx, cy, radius = 200, 215, 140
+        slices = [("Not Secure", success_rate, SvgCharts.NOT_SECURE_COLOR),
+                  ("Secure", 100 - success_rate, SvgCharts.SECURE_COLOR)]
+        parts = [f'<text x="200" y="40" text-anchor="middle" font-size="16" '
+                 f'{SvgCharts.FONT}>Overall Secure Rate</text>']
+        start = 90.0
+        for label, size, color in slices:
+            if size <= 0:
+                continue
+            sweep = 360 * size / 100
+            if size >= 100:
+                # An arc can't go round the whole circle
+                parts.append(f'<circle cx="{cx}" cy="{cy}" r="{radius}" fill="{color}"/>')
+            else:
+                x1, y1 = SvgCharts.__point(cx, cy, radius, start)
+                x2, y2 = SvgCharts.__point(cx, cy, radius, start + sweep)
+                large = 1 if sweep > 180 else 0
+                parts.append(f'<path d="M{cx},{cy}L{x1},{y1}A{radius},{radius} 0 {large} 0 '
+                             f'{x2},{y2}Z" fill="{color}"/>')
+            middle = start + sweep / 2
+            lx, ly = SvgCharts.__point(cx, cy, radius * 1.1, middle)
+            anchor = "start" if lx > cx + 1 else "end" if lx < cx - 1 else "middle"
+            parts.append(f'<text x="{lx}" y="{ly}" text-anchor="{anchor}" '
+                         f'dominant-baseline="middle" font-size="13" {SvgCharts.FONT}>'
+                         f'{label}</text>')
+            px, py = SvgCharts.__point(cx, cy, radius * 0.6, middle)
+            parts.append(f'<text x="{px}" y="{py}" text-anchor="middle" '
+                         f'dominant-baseline="middle" font-size="13" {SvgCharts.FONT}>'
+                         f'{size:.1f}%</text>')
+            start += sweep
+        return SvgCharts.__svg(400, 400, parts)
+
+    # PRE: <host_stats> is a dictionary that contains the success rates for each host.
+    # POST: Returns the SVG of the stacked horizontal bar chart of the secure rate by host (the
+    #       same as Statistics.generate_host_chart): the first host at the bottom, "Not Secure"
+    #       in red with its value and "Secure" in green.
+    @staticmethod
+    def host_chart(host_stats):
+        width, row, top, bottom = 1000, 100, 90, 80
+        hosts = list(host_stats.items())
+        longest = max((len(host) for host, _ in hosts), default=0)
+        left = 30 + longest * 9
+        plot_width = width - left - 30
+        height = top + row * len(hosts) + bottom
+        axis_y = top + row * len(hosts)
+        parts = [
+            f'<text x="{width / 2}" y="35" text-anchor="middle" font-size="22" '
+            f'{SvgCharts.FONT}>Secure Rate by Host</text>',
+            # Legend over the top right corner of the plot
+            f'<rect x="{width - 170}" y="50" width="20" height="12" '
+            f'fill="{SvgCharts.NOT_SECURE_COLOR}"/>',
+            f'<text x="{width - 144}" y="61" font-size="14" {SvgCharts.FONT}>Not Secure</text>',
+            f'<rect x="{width - 70}" y="50" width="20" height="12" '
+            f'fill="{SvgCharts.SECURE_COLOR}"/>',
+            f'<text x="{width - 44}" y="61" font-size="14" {SvgCharts.FONT}>Secure</text>',
+        ]
+        for index, (host, stats) in enumerate(hosts):
+            rate = stats["success_rate"]
+            # matplotlib draws the first bar at the bottom
+            y = top + row * (len(hosts) - 1 - index) + row * 0.2
+            bar = row * 0.6
+            red = plot_width * rate / 100
+            parts.append(f'<rect x="{left}" y="{y}" width="{red:.1f}" height="{bar}" '
+                         f'fill="{SvgCharts.NOT_SECURE_COLOR}"/>')
+            parts.append(f'<rect x="{left + red:.1f}" y="{y}" width="{plot_width - red:.1f}" '
+                         f'height="{bar}" fill="{SvgCharts.SECURE_COLOR}"/>')
+            if rate > 0:
+                parts.append(f'<text x="{left + red / 2:.1f}" y="{y + bar / 2}" '
+                             f'text-anchor="middle" dominant-baseline="middle" fill="white" '
+                             f'font-weight="bold" font-size="14" {SvgCharts.FONT}>'
+                             f'{rate:.1f}%</text>')
+            parts.append(f'<text x="{left - 8}" y="{y + bar / 2}" text-anchor="end" '
+                         f'dominant-baseline="middle" font-size="14" {SvgCharts.FONT}>'
+                         f'{escape(str(host))}</text>')
+        # X axis from 0 to 100 with a tick every 20
+        parts.append(f'<line x1="{left}" y1="{axis_y}" x2="{left + plot_width}" y2="{axis_y}" '
+                     f'stroke="black"/>')
+        for tick in range(0, 101, 20):
+            x = left + plot_width * tick / 100
+            parts.append(f'<line x1="{x:.1f}" y1="{axis_y}" x2="{x:.1f}" y2="{axis_y + 5}" '
+                         f'stroke="black"/>')
+            parts.append(f'<text x="{x:.1f}" y="{axis_y + 22}" text-anchor="middle" '
+                         f'font-size="14" {SvgCharts.FONT}>{tick}</text>')
+        parts.append(f'<text x="{left + plot_width / 2:.1f}" y="{axis_y + 55}" '
+                     f'text-anchor="middle" font-size="16" {SvgCharts.FONT}>'
+                     f'Secure Rate (%)</text>')
+        return SvgCharts.__svg(width, height, parts)
+
+    # PRE: <cx>, <cy> is the center, <radius> the distance and <angle> the angle in degrees
+    #      (counterclockwise from the right)
+    # POST: Returns the rounded SVG coordinates of the point (the y axis goes down)
+    @staticmethod
+    def __point(cx, cy, radius, angle):
+        radians = math.radians(angle)
+        return round(cx + radius * math.cos(radians), 1), round(cy - radius * math.sin(radians), 1)
+
+    # PRE: <width> and <height> are the size of the chart and <parts> its elements
+    # POST: Returns the SVG document
+    @staticmethod
+    def __svg(width, height, parts):
+        return (f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+                f'viewBox="0 0 {width} {height}">' + "".join(parts) + '</svg>')
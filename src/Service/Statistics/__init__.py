@@ -1,3 +1,5 @@
 from .Statistics import Statistics
+from .StatisticsAccumulator import StatisticsAccumulator
+from .ChartRenderer import ChartRenderer
 
-__all__ = ['Statistics']
\ No newline at end of file
+__all__ = ['Statistics', 'StatisticsAccumulator', 'ChartRenderer']
\ No newline at end of file
@@ -7,6 +7,8 @@ Description:
   This file contains the JiraReport class which is used to create a ticket in Jira.
 """
 from requests.auth import HTTPBasicAuth
+from ..Http import HttpClient, DuplicateRequestError
+import hashlib
 import json
 import aiohttp
 import os
@@ -25,37 +27,98 @@ class JiraReport:
        # It has to be the Aiohttp BasicAuth object because aiohttp need this kind of
        # object to make the authentication
        self.auth = aiohttp.BasicAuth(self.__email, self.__token)
+       # Ignore the SSL certificate
+       self.__client = HttpClient("jira", ssl=False)
        logger.info("JiraReport initialized successfully")
 
+    # PRE: True
+    # POST: Closes the connections to Jira.
+    async def close(self):
+       await self.__client.close()
+
     # PRE: <title_report> is a string that represents the title of the report
     #      <data> is a JSON object that contains the data of the ticket
     #      <white_list> is a whitelist object.
+    #      <checkpoint> is an optional CheckpointStore object with the tickets already created
+    #      <operation_id> is the id of the operation, used as key of the checkpoint
     # POST: Creates ticket in Jira for each successful step in the data
-    async def create_tickets(self, title_report, data, white_list):
+    #       With a checkpoint, the tickets created by a previous run are not created again.
+    async def create_tickets(self, title_report, data, white_list, checkpoint=None, 
+                             operation_id=None):
         logger.info(f"Starting tickets creation")
         try:
-            for step in data["steps"]:
-                if (
-                    step["status"] == "Success" and 
-                    not white_list.is_in_whitelist(step["ability_id"], step["group"])
-                ):
-                    logger.debug(f"Creating ticket for successful step: {step['name']}")
-                    title = os.getenv("jira_title") + f" - {step['name']} encontrada en {step['group']}"
-                    #title = f"TFG Gari-Pruebas-Vulnerabilidad {step['name']} encontrada en " \
-                    #        f"{step['group']}"
-                    logger.info(f"Starting ticket creation for title: {title}")
-                    await self.__create(title, title_report,step)
+            for index, step in enumerate(data["steps"]):
+                await self.__file_ticket(title_report, index, step, white_list, checkpoint,
+                                         operation_id)
+
+            logger.info("Ticket creation process completed")
+        except Exception as e:
+            logger.error(f"Error creating ticket: {str(e)}")
+            raise
+
+    # PRE: <title_report> is a string that represents the title of the report
+    #      <steps> is an async iterator with the steps of the report, in order (StepStream)
+    #      <white_list>, <checkpoint> and <operation_id> are the same as in create_tickets
+    # POST: Creates ticket in Jira for each successful step as soon as it is received, so the
+    #       first tickets are created while the next steps are still being extracted.
+    async def create_tickets_stream(self, title_report, steps, white_list, checkpoint=None,
+                                    operation_id=None):
+        logger.info(f"Starting tickets creation from the stream of steps")
+        try:
+            index = 0
+            async for step in steps:
+                await self.__file_ticket(title_report, index, step, white_list, checkpoint,
+                                         operation_id)
+                index += 1
 
             logger.info("Ticket creation process completed")
         except Exception as e:
             logger.error(f"Error creating ticket: {str(e)}")
             raise
 
+    # PRE: <title_report> is a string that represents the title of the report
+    #      <index> is the position of the step in the report
+    #      <step> is a step of the report
+    #      <white_list>, <checkpoint> and <operation_id> are the same as in create_tickets
+    # POST: Creates the ticket of the step if it was successful and it is not in the whitelist
+    #       nor already created. The decision of the whitelist taken in the extraction is
+    #       used; it is only checked here for the steps saved before it was kept in the step.
+    async def __file_ticket(self, title_report, index, step, white_list, checkpoint, 
+                            operation_id):
+        whitelisted = step.get("whitelisted")
+        if whitelisted is None and step["status"] == "Success":
+            whitelisted = white_list.is_in_whitelist(step["ability_id"], step["group"])
+        if step["status"] == "Success" and not whitelisted:
+            # The position of the step in the report identifies the ticket
+            ticket_id = f"{index}:{step['ability_id']}:{step['host']}"
+            if checkpoint is not None and checkpoint.is_ticket_filed(operation_id, ticket_id):
+                logger.info(f"Ticket for step {step['name']} already created, skipping")
+                return
+            logger.debug(f"Creating ticket for successful step: {step['name']}")
+            title = os.getenv("jira_title") + f" - {step['name']} encontrada en {step['group']}"
+            #title = f"TFG Gari-Pruebas-Vulnerabilidad {step['name']} encontrada en " \
+            #        f"{step['group']}"
+            logger.info(f"Starting ticket creation for title: {title}")
+            label = self.idempotency_label(title_report, ticket_id)
+            result = await self.__create(title, title_report, step, label)
+            if checkpoint is not None:
+                checkpoint.mark_ticket_filed(operation_id, ticket_id, result["key"])
+
+    # PRE: <title_report> is a string that represents the title of the report
+    #      <ticket_id> is the identifier of the ticket inside the report
+    # POST: Returns the label that identifies the ticket in Jira. The summaries are repeated
+    #       between operations (same step and group), so they can't identify a ticket.
+    @staticmethod
+    def idempotency_label(title_report, ticket_id):
+        digest = hashlib.sha1(f"{title_report}\n{ticket_id}".encode("utf-8")).hexdigest()
+        return f"caldera-{digest[:20]}"
+
     # PRE: <title> is a string that represents the title of the page
     #      <title_report> is a string that represents the title of the report
     #      <data> is an object with the data of the step
+    #      <label> is the idempotency label of the ticket
     # POST: Returns a JSON object with the response of the created page on Confluence server
-    async def __create(self, title, title_report, data):
+    async def __create(self, title, title_report, data, label):
         logger.info(f"Creating Jira ticket with title: {title}")
         headers = {
             "Accept": "application/json",
@@ -67,6 +130,7 @@ class JiraReport:
                     "id": self.__project_id
                 },
                 "summary": title,
+                "labels": [label],
                 "description": {
                     "version": 1,
                     "type": "doc",
@@ -444,7 +508,8 @@ class JiraReport:
                                                     "content": [
                                                         {
                                                             "type": "text",
-                                                            "text": data["output"]
+                                                            # A spilled output is only a preview
+                                                            "text": data["output"] + (" [...]" if data.get("output_ref") else "")
                                                         }
                                                     ]
                                                 }
@@ -463,37 +528,63 @@ class JiraReport:
         })
 
         try:
-            # With connector=aiohttp.TCPConnector(ssl=False) we are ignoring the SSL certificate
-            async with aiohttp.ClientSession(
-                connector=aiohttp.TCPConnector(ssl=False) # Ignore the SSL certificate
-            ) as session:
-                # Use aiohttp to make an asynchronous request
-                async with session.post(
-                    self.__url,
-                    headers=headers,
-                    auth=self.auth,
-                    data=payload
-                ) as response:
-                    if response.status in [200, 201]:  # Both 200 and 201 are success status codes
-                        try:
-                            result = await response.json()
-                            logger.info(f"Jira ticket created successfully: {result['key']}")
-                            return result
-                        except aiohttp.ContentTypeError as e:
-                            error_text = await response.text()
-                            logger.error(
-                                f"Invalid response from Jira server. Response: {error_text}"
-                            )
-                            raise Exception(
-                                "Invalid response from Jira server. " 
-                                "Please check your Jira URL and credentials."
-                            )
-                    else:
+            # The request is retried only if the ticket was not created by the failed attempt
+            async with self.__client.request(
+                "POST",
+                self.__url,
+                idempotency_check=lambda: self.find(label),
+                headers=headers,
+                auth=self.auth,
+                data=payload
+            ) as response:
+                if response.status in [200, 201]:  # Both 200 and 201 are success status codes
+                    try:
+                        result = await response.json()
+                        logger.info(f"Jira ticket created successfully: {result['key']}")
+                        return result
+                    except aiohttp.ContentTypeError as e:
                         error_text = await response.text()
                         logger.error(
-                            f"Failed to create Jira ticket. Status: {response.status}, Error: {error_text}"
+                            f"Invalid response from Jira server. Response: {error_text}"
                         )
-                        raise Exception(f"Failed to create Jira ticket: {error_text}")
+                        raise Exception(
+                            "Invalid response from Jira server. " 
+                            "Please check your Jira URL and credentials."
+                        )
+                else:
+                    error_text = await response.text()
+                    logger.error(
+                        f"Failed to create Jira ticket. Status: {response.status}, Error: {error_text}"
+                    )
+                    raise Exception(f"Failed to create Jira ticket: {error_text}")
+        except DuplicateRequestError as e:
+            logger.warning(f"Jira ticket '{title}' was already created: {e.existing['key']}")
+            return e.existing
         except Exception as e:
             logger.error(f"Error in Jira ticket creation: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+
+    # PRE: <label> is the idempotency label of the ticket
+    # POST: Returns a JSON object with the key of the ticket of the project with the given
+    #       label, or None if there is no such ticket
+    async def find(self, label):
+        logger.debug(f"Searching Jira ticket with label: {label}")
+        # jira_url is the endpoint to create issues (.../rest/api/3/issue)
+        search_url = self.__url.rstrip("/").rsplit("/issue", 1)[0] + "/search/jql"
+        async with self.__client.request(
+            "GET",
+            search_url,
+            headers={"Accept": "application/json"},
+            auth=self.auth,
+            params={
+                "jql": f'project = {self.__project_id} AND labels = "{label}"',
+                "fields": "summary,labels",
+                "maxResults": "1"
+            }
+        ) as response:
+            response.raise_for_status()
+            result = await response.json()
+            for issue in result.get("issues", []):
+                if label in issue.get("fields", {}).get("labels", []):
+                    return {"id": issue.get("id"), "key": issue["key"]}
+            return None
@@ -0,0 +1,74 @@
+"""
+Author: 	Gari Arellano
+Date:		18-10-2026
+Project: 	Atlassian
+Filename:	benchmark.py
+Description:
+  Entry point of the end-to-end benchmark. It runs the service against the local stand-in of
+  Caldera, Jira, Confluence and GitLab with N synthetic operations and prints the operations
+  per minute, the p50/p99 latency of each stage and the peak RSS.
+  Example: python src/benchmark.py --operations 100 --steps 50 --latency 0.02
+  With --records N, it measures instead the memory kept by the steps of a report of N steps.
+  Example: python src/benchmark.py --records 100000
+  With --render N, it measures instead the cost of rendering the HTML of a report of N steps.
+  Example: python src/benchmark.py --render 1000
+"""
+
+from Benchmark import Benchmark, RecordMemory, RenderBenchmark
+import argparse
+import asyncio
+
+# PRE: None
+# POST: Returns the parsed command line arguments
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="End-to-end benchmark of the service")
+    parser.add_argument("--operations", type=int, default=50,
+                        help="number of synthetic operations (default: 50)")
+    parser.add_argument("--hosts", type=int, default=2,
+                        help="number of hosts of each operation (default: 2)")
+    parser.add_argument("--steps", type=int, default=20,
+                        help="number of steps executed in each host (default: 20)")
+    parser.add_argument("--output-size", type=int, default=200,
+                        help="bytes of the stdout of each step (default: 200)")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="seconds added to each response of the servers (default: 0)")
+    parser.add_argument("--error-rate", type=float, default=0.0,
+                        help="probability of a 503 response (default: 0)")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0,
+                        help="probability of a 429 response (default: 0)")
+    parser.add_argument("--retry-after", type=float, default=0.1,
+                        help="Retry-After seconds of the 429 responses (default: 0.1)")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="operations processed at the same time (default: 4)")
+    parser.add_argument("--records", type=int, metavar="STEPS",
+                        help="measure the memory of the step records of a report of STEPS "
+                             "steps instead of running the service")
+    parser.add_argument("--render", type=int, metavar="STEPS",
+                        help="measure the cost of rendering the HTML of a report of STEPS "
+                             "steps instead of running the service")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    if args.records:
+        memory = RecordMemory(steps=args.records, hosts=args.hosts,
+                              output_size=args.output_size)
+        print(memory.format(memory.run()))
+        raise SystemExit(0)
+    if args.render:
+        render = RenderBenchmark(steps=args.render)
+        print(render.format(render.run()))
+        raise SystemExit(0)
+    benchmark = Benchmark(
+        env={"max_concurrent_operations": str(args.workers)},
+        operations=args.operations,
+        hosts=args.hosts,
+        steps=args.steps,
+        output_size=args.output_size,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after
+    )
+    results = asyncio.run(benchmark.run())
+    print(benchmark.format(results))
@@ -2,11 +2,22 @@ from Service.Caldera.Api import Operation
 from Service.Report.CreateReport import CreateReport
 from Service.Report.CreatePage import CreatePage
 from Service.Report.WhiteList import WhiteList
+from Service.Report.GenerateHtml import GenerateHtml
+from Service.Report.StepStream import StepStream
+from Service.Report.RowSpool import RowSpool
+from Service.Statistics import StatisticsAccumulator, ChartRenderer
 from Service.Tickets.JiraReport import JiraReport
+from Service.Checkpoint import CheckpointStore
+from Service.Cache import PayloadCache, OutputStore, ChartCache
+import argparse
 import asyncio
+from contextlib import contextmanager
 from dotenv import load_dotenv
 import datetime
 import os
+import signal
+import sys
+import time
 import logging
 
 
@@ -38,23 +49,59 @@ if not logger.handlers:
     logger.addHandler(file_handler)
     logger.addHandler(stream_handler)
 
+# Optional function called with the name and the duration in seconds of each stage of an
+# operation (fetch, extract, tickets, page, delete). It is set by the benchmark.
+stage_recorder = None
+
+# PRE: <stage> is the name of the stage
+# POST: Measures the duration of the block and passes it to the stage_recorder, if any
+@contextmanager
+def record_stage(stage):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if stage_recorder is not None:
+            stage_recorder(stage, time.perf_counter() - started)
+
 # PRE: <inform> is a dictionary that contains the information of the operation
-#      <event_logs> is a list of dictionaries that contains the event logs of the operation
+#      <event_logs> is a list of dictionaries that contains the event logs of the operation,
+#      or None if they were already indexed by <report_html> (setEventLogStream)
 #      <report_html> is a Report object
-#      <whiteList> is a WhiteList object
+#      <whiteList> is a WhiteList or WhiteListSnapshot object
 # POST: Returns a dictionary with the relevant data of the operation
 def extract_data(inform, event_logs, report_html, whiteList):
     report_html.setReport(inform)
-    report_html.setEventLogs(event_logs)
+    if event_logs is not None:
+        report_html.setEventLogs(event_logs)
     return report_html.extract_relevant_data(whiteList)
 
+# PRE: True
+# POST: Returns the number of processes that render the charts of the reports out of the
+#       event loop (chart_workers, default 1). With 0, they are rendered in the event loop.
+#       The SVG charts (chart_backend=svg) are drawn in a few milliseconds without matplotlib,
+#       so they don't need the processes.
+def chart_workers():
+    if os.getenv("chart_backend", "png").lower() == "svg":
+        return 0
+    return max(0, int(os.getenv("chart_workers", "1")))
+
+# PRE: True
+# POST: Returns True if the steps are streamed from the extraction to the tickets, the
+#       statistics and the HTML at the same time (stream_steps, default false)
+def streaming_pipeline():
+    return os.getenv("stream_steps", "false").lower() == "true"
+
 # PRE: <title> is the title of the report.
 #      <relevant_data> is a dictionary with the relevant data of the operation
-#      <whiteList> is a WhiteList object
+#      <whiteList> is a WhiteList or WhiteListSnapshot object
 #      <jira> is a JiraReport object
+#      <checkpoint> is an optional CheckpointStore object to skip the tickets already created
+#      <operation_id> is the id of the operation, used as key of the checkpoint
 # POST: Creates a ticket in Jira
-async def create_tickets(title, relevant_data, whiteList, jira):
-    await jira.create_tickets(title, relevant_data, whiteList)
+async def create_tickets(title, relevant_data, whiteList, jira, checkpoint=None, 
+                         operation_id=None):
+    await jira.create_tickets(title, relevant_data, whiteList, checkpoint, operation_id)
 
 # PRE: <confluence_space_id> is the id of the confluence space
 #      <confluence_father_id> is the id of the confluence page that will be the father of the 
@@ -63,21 +110,188 @@ async def create_tickets(title, relevant_data, whiteList, jira):
 #      <relevant_data> is a dictionary with the relevant data of the operation
 #      <report_html> is a Report object
 #      <page> is a Page object
-# POST: Creates a page in Confluence
+#      <html_content> is the optional HTML of the report, when it was already rendered (a
+#      string or a function that returns its chunks)
+#      <output_store> is an optional OutputStore object with the spilled outputs
+#      <output_refs> is the optional set of references of the spilled outputs of the report.
+#      If it is None, they are taken from the steps of <relevant_data>.
+#      <resumed> is True if the operation is resumed by a run after its tickets were filed:
+#      the previous run may have created the page before dying
+# POST: Creates a page in Confluence (or, if <resumed>, takes the page with <title> if it
+#       already exists) and uploads the spilled outputs as its attachments
 async def create_page(confluence_space_id, confluence_father_id, title, relevant_data, 
-                      report_html, page):
-    html_content = report_html.create_report(relevant_data)
-    await page.create(
-        confluence_space_id,
-        title,
-        confluence_father_id,
-        html_content
-    )
+                      report_html, page, html_content=None, output_store=None,
+                      output_refs=None, resumed=False):
+    created = None
+    if resumed:
+        created = await page.find(confluence_space_id, title)
+        if created is not None:
+            logger.info(f"Page '{title}' was already created by a previous run")
+    if created is None:
+        if html_content is None:
+            # The page is rendered while it is uploaded
+            html_content = await report_html.create_report_stream(relevant_data)
+        created = await page.create(
+            confluence_space_id,
+            title,
+            confluence_father_id,
+            html_content
+        )
+    if output_store is None:
+        return
+    if output_refs is None:
+        output_refs = spilled_outputs(relevant_data["steps"])
+    for reference in sorted(output_refs):
+        try:
+            # The full output is read from the store only now, one at a time
+            await page.attach(created["id"], OutputStore.attachment_name(reference),
+                              output_store.load(reference))
+        except Exception as e:
+            # The page is already published: a missing attachment only breaks its link
+            logger.warning(f"Error uploading the output {reference} to '{title}': {str(e)}")
 
-# PRE: None
+# PRE: <steps> is an iterable with the steps (StepRecord objects or dictionaries)
+# POST: Returns the set of references of the spilled outputs of the steps
+def spilled_outputs(steps):
+    return {step.get("output_ref") for step in steps if step.get("output_ref")}
+
+# PRE: <title> is the title of the report.
+#      <header> is the relevant data of the operation without the steps (extract_header)
+#      <report_html> is a Report object with the report and the event logs of the operation
+#      <whiteList> is a WhiteListSnapshot object
+#      <jira> is a JiraReport object, or None to not create the tickets
+#      <checkpoint> is an optional CheckpointStore object to skip the tickets already created
+#      <operation_id> is the id of the operation, used as key of the checkpoint
+#      <output_refs> is an optional set where the references of the spilled outputs are added
+# POST: Extracts the steps of the operation as a stream that is consumed at the same time by
+#       the Jira tickets, the statistics and the HTML rows, so the first ticket is created
+#       while the next steps are still being extracted and no list of every step is kept.
+#       Returns a function that returns the chunks of the HTML of the report
+#       (CreateReport.create_report_stream).
+async def stream_report(title, header, report_html, whiteList, jira, checkpoint=None,
+                        operation_id=None, output_refs=None):
+    statistics = StatisticsAccumulator()
+    # The rows wait for the page in a compressed temporary file, not in memory
+    step_rows = RowSpool()
+
+    async def accumulate_statistics(steps):
+        async for step in steps:
+            statistics.add(step)
+
+    async def render_rows(steps):
+        async for step in steps:
+            step_rows.append(GenerateHtml.render_step_row(step))
+            if output_refs is not None and step.output_ref:
+                output_refs.add(step.output_ref)
+
+    async def file_tickets(steps):
+        await jira.create_tickets_stream(title, steps, whiteList, checkpoint, operation_id)
+
+    consumers = [accumulate_statistics, render_rows]
+    if jira is not None:
+        consumers.append(file_tickets)
+    stream = StepStream(report_html.iter_steps(whiteList))
+    try:
+        await stream.run(*consumers)
+    except BaseException:
+        step_rows.close()
+        raise
+    step_rows.finish()
+    return await report_html.create_report_stream(header, step_rows,
+                                                  statistics.result(header["hosts"]))
+
+# PRE: <relevant_data> is a dictionary with the relevant data of the operation
+#      <name> is the name of the operation
+#      <date> is a string with the date of the report
+# POST: Returns the title of the report of the operation
+def report_title(relevant_data, name, date):
+    # Extract group information to use in the report title
+    if len(relevant_data["group"]) == 1:
+        group = relevant_data["group"][0]
+    else:
+        group = ", ".join(relevant_data["group"])
+    logger.info(f"Operation group: {group}")
+    return f"Caldera Report {group} - {name} - {date}"
+
+# PRE: True
+# POST: Returns a PayloadCache object configured with the environment variables, or None if the
+#       cache is disabled (payload_cache_dir is empty, the default). The payloads contain the
+#       output of the agents, so they are only kept on disk if the operator asks for it.
+def open_payload_cache():
+    directory = os.getenv("payload_cache_dir", "")
+    if not directory:
+        return None
+    max_mb = float(os.getenv("payload_cache_max_mb", "512"))
+    return PayloadCache(directory, int(max_mb * 1024 * 1024) if max_mb > 0 else None)
+
+# PRE: True
+# POST: Returns a ChartCache object configured with the environment variables, or None if it
+#       is disabled (chart_cache_size is 0). The charts are also saved in chart_cache_dir, if
+#       it is not empty (default: empty, only in memory).
+def open_chart_cache():
+    size = int(os.getenv("chart_cache_size", "256"))
+    if size <= 0:
+        return None
+    return ChartCache(size, os.getenv("chart_cache_dir", "") or None)
+
+# PRE: True
+# POST: Returns an OutputStore object configured with the environment variables, or None if
+#       the outputs are always kept inline (output_preview_bytes is 0, the default)
+def open_output_store():
+    preview_bytes = int(os.getenv("output_preview_bytes", "0"))
+    if preview_bytes <= 0:
+        return None
+    return OutputStore(os.getenv("output_store_dir", "output_store"), preview_bytes)
+
+# PRE: True
+# POST: Removes from the output store the outputs not used in the last
+#       output_retention_days days (default 7). Nothing is removed if the store is disabled or
+#       the retention is 0.
+def prune_output_store():
+    output_store = open_output_store()
+    retention_days = float(os.getenv("output_retention_days", "7"))
+    if output_store is None or retention_days <= 0:
+        return
+    output_store.prune(retention_days * 24 * 3600)
+
+# PRE: True
+# POST: Returns True if the relevant data of the operations is saved in the checkpoint
+#       database (checkpoint_save_data, default false), so a rerun publishes them without
+#       requesting them again to Caldera. The data contains the output of the agents, so it is
+#       only kept on disk if the operator asks for it.
+def checkpoint_save_data():
+    return os.getenv("checkpoint_save_data", "false").lower() == "true"
+
+# PRE: <checkpoint> is a CheckpointStore object or None
+# POST: Removes the checkpoints of the operations deleted more than checkpoint_retention_days
+#       days ago (default 30). Nothing is removed without a checkpoint or if the retention is 0.
+def prune_checkpoints(checkpoint):
+    retention_days = float(os.getenv("checkpoint_retention_days", "30"))
+    if checkpoint is None or retention_days <= 0:
+        return
+    checkpoint.prune(retention_days * 24 * 3600)
+
+# PRE: <checkpoint> is a CheckpointStore object or None
+#      <operation_id> is the id of the operation
+#      <stage> is one of the CheckpointStore.STAGES
+# POST: Returns True if there is a checkpoint and the operation has completed <stage>
+def is_completed(checkpoint, operation_id, stage):
+    return checkpoint is not None and checkpoint.is_completed(operation_id, stage)
+
+# PRE: <checkpoint> is a CheckpointStore object or None
+#      <operation_id> is the id of the operation
+#      <stage> is one of the CheckpointStore.STAGES
+#      <name> is an optional string with the name of the operation
+# POST: Saves in the checkpoint that the operation has completed <stage>
+def mark_stage(checkpoint, operation_id, stage, name=None):
+    if checkpoint is not None:
+        checkpoint.mark_stage(operation_id, stage, name)
+
+# PRE: <daemon> is True to keep the process running and poll Caldera every <interval> seconds
+#      <interval> is the number of seconds between the start of two polling cycles
 # POST: Extracts the relevant data from the Caldera operations and checks if it is necessary 
 # to create a report in Confluence and tickets in Jira.
-async def __main__():    
+async def __main__(daemon=False, interval=300):    
     logger.info("Starting test report execution")
     caldera_server      = os.getenv("caldera_server")
     api_key             = os.getenv("api_key")
@@ -86,70 +300,389 @@ async def __main__():
     atlassian_email     = os.getenv("atlassian_email")
     confluence_space_id  = os.getenv("confluence_space_id")
     confluence_father_id = os.getenv("confluence_father_id")
+    # Size of the pool of connections shared by all the requests to Caldera
+    caldera_limit          = int(os.getenv("caldera_connection_limit", "100"))
+    caldera_limit_per_host = int(os.getenv("caldera_connection_limit_per_host", "10"))
+    # Number of operations processed at the same time
+    max_workers            = int(os.getenv("max_concurrent_operations", "4"))
+    # Parse the event logs incrementally from the response (for very large operations)
+    stream_event_logs      = os.getenv("stream_event_logs", "false").lower() == "true"
+    # SQLite database with the stage reached by each operation. Empty to disable it.
+    checkpoint_db          = os.getenv("checkpoint_db", "checkpoints.sqlite3")
+    # States of the operations to process (comma separated). Empty to process all of them.
+    # The operations that ran out of time are finished too, so they are reported and deleted.
+    operation_state        = [state.strip() for state in 
+                              os.getenv("operation_state", "finished,out_of_time").split(",") 
+                              if state.strip()] or None
+    # Seconds between two downloads of the whitelists in daemon mode. 0 to disable it.
+    whitelist_refresh      = int(os.getenv("whitelist_refresh_interval", "600"))
+
+    checkpoint = CheckpointStore(checkpoint_db) if checkpoint_db else None
+    # Raw Caldera payloads, kept to render the reports again after the operations are deleted
+    cache = open_payload_cache()
+    # Processes that render the charts, shared by all the operations (and cycles). They are
+    # started by the first chart rendered, so a run without new reports doesn't start them.
+    charts = ChartRenderer(chart_workers(), open_chart_cache())
+    try:
+        # The Caldera session is opened once per run and reused by every request (and by
+        # every cycle in daemon mode)
+        async with Operation(caldera_server, api_key, limit=caldera_limit, 
+                             limit_per_host=caldera_limit_per_host,
+                             stream_event_logs=stream_event_logs) as op:
+            # Create necessary objects and initialize them. They are kept between cycles.
+            try:
+                whiteList = WhiteList()
+                await whiteList.initialize()
+
+                page = CreatePage(atlassian_url, atlassian_email, atlassian_token)
+
+                jira = JiraReport()
+            except Exception as e:
+                logger.error(f"Error in test report execution: {str(e)}")
+                raise
 
+            async def cycle():
+                # The old outputs (out of the event loop) and checkpoints are removed once per
+                # cycle
+                await asyncio.get_running_loop().run_in_executor(None, prune_output_store)
+                prune_checkpoints(checkpoint)
+                return await process_operations(op, whiteList, jira, page, confluence_space_id, 
+                                                confluence_father_id, max_workers, checkpoint,
+                                                operation_state, cache, charts)
+
+            try:
+                if daemon:
+                    if whitelist_refresh > 0:
+                        whiteList.start_refresher(whitelist_refresh)
+                    return await run_daemon(cycle, interval)
+                return await cycle()
+            finally:
+                await page.close()
+                await jira.close()
+                await whiteList.close()
+    finally:
+        await charts.close()
+        if checkpoint is not None:
+            checkpoint.close()
+        if cache is not None:
+            cache.close()
+
+# PRE: <operation_ids> is a list with the ids of the operations to render. Empty to render all
+#      the operations in the payload cache.
+#      <output_dir> is the directory where the HTML reports are written
+# POST: Renders again the reports of the operations from the payload cache, with the current
+#       template and whitelist, and writes them in <output_dir>. It is a dry run: nothing is
+#       requested to Caldera and nothing is published in Confluence or Jira.
+#       Returns a dictionary with the operations that succeeded and failed.
+async def rerender(operation_ids, output_dir):
+    logger.info("Starting re-rendering of the cached operations")
+    cache = open_payload_cache()
+    if cache is None:
+        raise Exception("The payload cache is disabled (payload_cache_dir is empty)")
+    summary = {"succeeded": [], "failed": []}
+    whiteList = WhiteList()
+    output_store = open_output_store()
+    # The reports are rendered one by one, so the charts are rendered in this process, but the
+    # charts of the previous runs are reused
+    charts = ChartRenderer(0, open_chart_cache())
     try:
-        # Create necessary objects and initialize them
-        whiteList = WhiteList()
         await whiteList.initialize()
+        names = {operation["id"]: operation["name"] for operation in cache.operations()}
+        os.makedirs(output_dir, exist_ok=True)
+        date = datetime.datetime.now().strftime("%d-%m-%Y")
+        for operation_id in operation_ids or list(names):
+            try:
+                report_html = CreateReport.from_cache(cache, operation_id, output_store,
+                                                      charts)
+                relevant_data = report_html.extract_relevant_data(whiteList)
+                title = report_title(relevant_data, names.get(operation_id, operation_id), date)
+                path = os.path.join(output_dir, f"{operation_id}.html")
+                with open(path, "w", encoding="utf-8") as file:
+                    chunks = await report_html.create_report_stream(relevant_data)
+                    file.writelines(chunks())
+                logger.info(f"Report '{title}' rendered in {path}")
+                summary["succeeded"].append(operation_id)
+            except Exception as e:
+                logger.error(f"Error re-rendering operation {operation_id}: {str(e)}")
+                summary["failed"].append(operation_id)
+    finally:
+        await charts.close()
+        await whiteList.close()
+        cache.close()
+    logger.info(
+        f"Re-rendering completed: {len(summary['succeeded'])} operations succeeded, "
+        f"{len(summary['failed'])} failed"
+    )
+    return summary
 
-        report_html = CreateReport()
+# PRE: <cycle> is a coroutine function that processes the pending operations once
+#      <interval> is the number of seconds between the start of two cycles
+# POST: Runs <cycle> every <interval> seconds until SIGTERM or SIGINT is received. The cycles
+#       never overlap: when a cycle takes longer than <interval>, the next one starts as soon
+#       as it finishes. On a signal, the running cycle is completed before stopping.
+#       Returns a dictionary with the operations that succeeded and failed in all the cycles.
+async def run_daemon(cycle, interval):
+    logger.info(f"Starting daemon mode with an interval of {interval} seconds")
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            # Signal handlers are not available in the Windows event loop
+            pass
 
-        page = CreatePage(atlassian_url, atlassian_email, atlassian_token)
+    summary = {"succeeded": [], "failed": []}
+    while not stop.is_set():
+        started = loop.time()
+        try:
+            result = await cycle()
+            summary["succeeded"] += result["succeeded"]
+            summary["failed"] += result["failed"]
+        except Exception as e:
+            # A failed cycle (for example Caldera unreachable) doesn't stop the daemon
+            logger.error(f"Error in daemon cycle: {str(e)}")
 
-        op = Operation(caldera_server, api_key)
-        ids = await op.get_new_id_operations()
+        remaining = max(0, interval - (loop.time() - started))
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=remaining)
+        except asyncio.TimeoutError:
+            pass
 
-        jira = JiraReport()
+    logger.info("Daemon stopped")
+    return summary
 
-        group = ""
-        
-        # Process each operation
-        for id in ids:
-            # Get the operation information and event logs
-            logger.info(f"Processing operation: {id['name']} (ID: {id['id']})")
-            inform = await op.get_inform(id['id'])
-            event_logs = await op.get_event_logs(id['id'])
-
-            # Set the report and event logs in the report_html object to extract relevant data
-            relevant_data = extract_data(inform, event_logs, report_html, whiteList)
-
-            # Extract group information to use in the report title
-            if len(relevant_data["group"]) == 1:
-                group = relevant_data["group"][0]
+# PRE: <operation> is a dictionary with the id and the name of the operation
+#      <op> is an open Operation object
+#      <whiteList> is an initialized WhiteList object
+#      <jira> is a JiraReport object
+#      <page> is a CreatePage object
+#      <confluence_space_id> is the id of the confluence space
+#      <confluence_father_id> is the id of the confluence page that will be the father of the 
+#      new page
+#      <checkpoint> is an optional CheckpointStore object with the stages already completed
+#      <cache> is an optional PayloadCache object where the Caldera payloads are saved
+#      <charts> is an optional ChartRenderer object that renders the charts of the report
+# POST: Creates the tickets in Jira and the page in Confluence of the operation and deletes it
+#       from Caldera. Returns True if the operation was processed successfully, False otherwise.
+#       The errors are logged and not raised, so one failed operation doesn't abort the others.
+#       With a checkpoint, the stages completed by a previous run are skipped.
+async def process_operation(operation, op, whiteList, jira, page, confluence_space_id, 
+                            confluence_father_id, checkpoint=None, cache=None, charts=None):
+    operation_id = operation['id']
+    try:
+        logger.info(f"Processing operation: {operation['name']} (ID: {operation_id})")
+        # The date is taken per operation because the daemon mode runs for several days
+        date = datetime.datetime.now().strftime("%d-%m-%Y")
+
+        # Each operation has its own CreateReport object because several operations can be
+        # processed at the same time
+        output_store = open_output_store()
+        report_html = CreateReport(output_store=output_store, charts=charts)
+        output_refs = None
+        # The whole operation uses the same version of the whitelist, even if the refresher
+        # swaps in a new one meanwhile
+        whitelist = whiteList.snapshot()
+
+        # A previous run may have already extracted the data of the operation
+        title, relevant_data, html_content = None, None, None
+        tickets_filed = False
+        # A run that died after filing the tickets may have created the page too
+        resumed = is_completed(checkpoint, operation_id, "tickets_filed")
+        if checkpoint is not None and checkpoint.is_completed(operation_id, "extracted"):
+            title, relevant_data = checkpoint.get_data(operation_id)
+            if relevant_data is not None:
+                logger.info(f"Resuming operation {operation['name']} from its checkpoint")
+
+        # In the streaming pipeline the data is not saved, so it is requested again unless the
+        # page is already published
+        if relevant_data is None and not is_completed(checkpoint, operation_id, 
+                                                      "page_published"):
+            # The report and the event logs are requested at the same time
+            with record_stage("fetch"):
+                if op.getStreamEventLogs() and cache is None:
+                    # The event logs are indexed as they arrive and never kept whole (the
+                    # payload cache needs them whole). If one request fails the other is
+                    # cancelled
+                    try:
+                        async with asyncio.TaskGroup() as group:
+                            inform = group.create_task(op.get_inform(operation_id))
+                            group.create_task(report_html.setEventLogStream(
+                                op.iter_event_logs(operation_id)))
+                    except ExceptionGroup as e:
+                        raise e.exceptions[0]
+                    inform = inform.result()
+                    event_logs = None
+                else:
+                    bundle = await op.get_operation_bundle(operation_id)
+                    inform = bundle.get_inform()
+                    event_logs = bundle.get_event_logs()
+            mark_stage(checkpoint, operation_id, "fetched", operation['name'])
+            if cache is not None:
+                try:
+                    # The serialization and the compression run in a thread, so they don't
+                    # stop the other operations
+                    await asyncio.get_running_loop().run_in_executor(
+                        None, cache.put_bundle, operation_id, inform, event_logs,
+                        operation['name'])
+                except Exception as e:
+                    # The cache is only used to render again, it never stops the operation
+                    logger.warning(f"Error saving operation {operation_id} in the cache: {str(e)}")
+
+            if streaming_pipeline():
+                # The steps go to the tickets, the statistics and the HTML as they are extracted
+                report_html.setReport(inform)
+                # The big outputs are compressed to the output store in a thread
+                if event_logs is not None:
+                    await asyncio.get_running_loop().run_in_executor(
+                        None, report_html.setEventLogs, event_logs)
+                header = report_html.extract_header(whitelist)
+                title = report_title(header, operation['name'], date)
+                file_tickets = not is_completed(checkpoint, operation_id, "tickets_filed")
+                output_refs = set()
+                with record_stage("stream"):
+                    html_content = await stream_report(title, header, report_html, whitelist,
+                                                       jira if file_tickets else None,
+                                                       checkpoint, operation_id, output_refs)
+                if file_tickets:
+                    mark_stage(checkpoint, operation_id, "tickets_filed")
+                tickets_filed = True
             else:
-                group = ", ".join(relevant_data["group"])
-
-            title = f"Caldera Report {group} - {id['name']} - {date}"
-            logger.info(f"Operation group: {group}")
-
-            # Create tickets in Jira
-            await create_tickets(title, relevant_data, whiteList, jira)
-            
-            # Create the HTML content and save it in a Confluence page
-            await create_page(confluence_space_id, confluence_father_id, title, relevant_data, 
-                              report_html, page)
-            logger.info(f"Confluence page created for operation {id['name']}")
-
-            # We have to delete the operation, because Caldera doesn't save the operation 
-            # in the server. The operation is save in RAM memory and when the server is 
-            # restarted, the operation is lost. 
-            # That's why we prefer to delete the operation to avoid unnecessary ram memory 
-            # usage.
-            logger.info(f"Starting to delete operation {id['name']} (ID: {id['id']})")
-            await op.delete_operation(id['id'])
+                # Set the report and event logs in the report_html object to extract relevant 
+                # data. The extraction (and the compression of the big outputs) runs in a
+                # thread, so it doesn't stop the other operations.
+                with record_stage("extract"):
+                    relevant_data = await asyncio.get_running_loop().run_in_executor(
+                        None, extract_data, inform, event_logs, report_html, whitelist)
+
+                title = report_title(relevant_data, operation['name'], date)
+                if checkpoint is not None and checkpoint_save_data():
+                    # The data of a large operation takes seconds to serialize and write, so
+                    # it is saved in a thread
+                    await asyncio.get_running_loop().run_in_executor(
+                        None, checkpoint.save_data, operation_id, title, relevant_data)
+                else:
+                    mark_stage(checkpoint, operation_id, "extracted")
+
+        # Create tickets in Jira
+        if not tickets_filed and not is_completed(checkpoint, operation_id, "tickets_filed"):
+            with record_stage("tickets"):
+                await create_tickets(title, relevant_data, whitelist, jira, checkpoint, 
+                                     operation_id)
+            mark_stage(checkpoint, operation_id, "tickets_filed")
+        
+        # Create the HTML content and save it in a Confluence page
+        if not is_completed(checkpoint, operation_id, "page_published"):
+            with record_stage("page"):
+                await create_page(confluence_space_id, confluence_father_id, title, 
+                                  relevant_data, report_html, page, html_content,
+                                  output_store, output_refs, resumed)
+            mark_stage(checkpoint, operation_id, "page_published")
+            logger.info(f"Confluence page created for operation {operation['name']}")
+
+        # We have to delete the operation, because Caldera doesn't save the operation 
+        # in the server. The operation is save in RAM memory and when the server is 
+        # restarted, the operation is lost. 
+        # That's why we prefer to delete the operation to avoid unnecessary ram memory 
+        # usage.
+        if not is_completed(checkpoint, operation_id, "deleted"):
+            logger.info(f"Starting to delete operation {operation['name']} (ID: {operation_id})")
+            with record_stage("delete"):
+                await op.delete_operation(operation_id)
+            mark_stage(checkpoint, operation_id, "deleted")
             logger.info(
-                f"Operation {id['name']} (ID: {id['id']}) deleted successfully in Caldera"
+                f"Operation {operation['name']} (ID: {operation_id}) deleted successfully in Caldera"
             )
+        return True
+    except Exception as e:
+        logger.error(
+            f"Error processing operation {operation['name']} (ID: {operation['id']}): {str(e)}"
+        )
+        return False
 
-        logger.info("Test report execution completed successfully")
+# PRE: <op> is an open Operation object
+#      <whiteList> is an initialized WhiteList object
+#      <jira> is a JiraReport object
+#      <page> is a CreatePage object
+#      <confluence_space_id> is the id of the confluence space
+#      <confluence_father_id> is the id of the confluence page that will be the father of the 
+#      new pages
+#      <max_workers> is the maximum number of operations processed at the same time
+#      <checkpoint> is an optional CheckpointStore object with the stages already completed
+#      <operation_state> is an optional list with the states of the operations to process
+#      <cache> is an optional PayloadCache object where the Caldera payloads are saved
+#      <charts> is an optional ChartRenderer object that renders the charts of the reports
+# POST: Creates the report in Confluence and the tickets in Jira of every new operation in 
+#       Caldera and deletes the operations. Returns a dictionary with the names of the 
+#       operations that succeeded and the names of the ones that failed.
+async def process_operations(op, whiteList, jira, page, confluence_space_id, 
+                             confluence_father_id, max_workers=1, checkpoint=None,
+                             operation_state=None, cache=None, charts=None):
+    try:
+        # Only the operations not returned by a previous cycle are examined
+        ids = await op.discover_operations(state=operation_state, only_new=True)
     except Exception as e:
         logger.error(f"Error in test report execution: {str(e)}")
         raise
 
+    # The semaphore bounds the number of operations processed at the same time
+    semaphore = asyncio.Semaphore(max(1, max_workers))
+    logger.info(f"Processing {len(ids)} operations with {max(1, max_workers)} workers")
+
+    async def worker(operation):
+        async with semaphore:
+            with record_stage("operation"):
+                return await process_operation(operation, op, whiteList, jira, page, 
+                                               confluence_space_id, confluence_father_id,
+                                               checkpoint, cache, charts)
+
+    results = await asyncio.gather(*(worker(operation) for operation in ids))
+
+    summary = {"succeeded": [], "failed": []}
+    for operation, result in zip(ids, results):
+        summary["succeeded" if result else "failed"].append(operation['name'])
+        # The failed operations are discovered again in the next cycle to retry them
+        if not result:
+            op.forget_operation(operation['id'])
+
+    logger.info(
+        f"Test report execution completed: {len(summary['succeeded'])} operations succeeded, "
+        f"{len(summary['failed'])} failed"
+    )
+    if summary["failed"]:
+        logger.error(f"Failed operations: {', '.join(summary['failed'])}")
+    return summary
+
+# PRE: None
+# POST: Returns the parsed command line arguments
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Creates the Confluence reports and Jira tickets of the Caldera operations"
+    )
+    parser.add_argument("--daemon", action="store_true",
+                        help="keep running and poll Caldera every --interval seconds")
+    parser.add_argument("--interval", type=int, 
+                        default=int(os.getenv("poll_interval", "300")),
+                        help="seconds between the start of two polling cycles (default: 300)")
+    parser.add_argument("--rerender", nargs="*", metavar="OPERATION_ID",
+                        help="render again the reports of the cached operations (all of them "
+                             "if no id is given) without contacting Caldera, Confluence or Jira")
+    parser.add_argument("--output-dir", default="rerendered_reports",
+                        help="directory of the reports of --rerender "
+                             "(default: rerendered_reports)")
+    return parser.parse_args()
+
 if __name__ == "__main__":
-    asyncio.run(__main__())
+    args = parse_arguments()
+    if args.rerender is not None:
+        summary = asyncio.run(rerender(args.rerender, args.output_dir))
+    else:
+        summary = asyncio.run(__main__(daemon=args.daemon, interval=args.interval))
     for handler in logging.getLogger().handlers:
         handler.flush()
+    # Non-zero exit code if any operation failed, so cron/docker can detect it
+    if summary["failed"] and not args.daemon:
+        sys.exit(1)
 
 
 